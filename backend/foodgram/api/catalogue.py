@@ -0,0 +1,136 @@
+import gzip
+import hashlib
+import os
+from pathlib import Path
+
+from django.conf import settings
+from django.db import transaction
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.cache import patch_vary_headers
+from recipes.models import Ingredient, Tag
+
+from .renderers import ORJSONRenderer
+from .serializers import IngredientSerializer, TagSerializer
+
+CATALOGUES = {
+    "tags": (Tag, TagSerializer),
+    "ingredients": (Ingredient, IngredientSerializer),
+}
+KEEP_VERSIONS = 3
+
+_cache = {}
+
+
+class Snapshot:
+    def __init__(self, version, content, compressed):
+        self.version = version
+        self.content = content
+        self.compressed = compressed
+
+
+def catalogue_root():
+    return Path(settings.CATALOGUE_ROOT)
+
+
+def render_catalogue(name):
+    model, serializer_class = CATALOGUES[name]
+    data = serializer_class(model.objects.all(), many=True).data
+    return ORJSONRenderer().render(data)
+
+
+def _write(path, content):
+    tmp_path = path.with_name(path.name + ".tmp")
+    tmp_path.write_bytes(content)
+    os.replace(tmp_path, path)
+
+
+def write_snapshot(name):
+    """Записывает версионный и текущий снимок каталога, обычный и .gz."""
+    content = render_catalogue(name)
+    compressed = gzip.compress(content, mtime=0)
+    version = hashlib.sha1(content).hexdigest()[:12]
+    root = catalogue_root()
+    root.mkdir(parents=True, exist_ok=True)
+    for filename in (f"{name}.{version}.json", f"{name}.json"):
+        _write(root / filename, content)
+        _write(root / f"{filename}.gz", compressed)
+    _write(root / f"{name}.version", version.encode())
+
+    versions = sorted(root.glob(f"{name}.*.json"),
+                      key=lambda path: path.stat().st_mtime, reverse=True)
+    for path in versions[KEEP_VERSIONS:]:
+        for stale in (path, path.with_name(path.name + ".gz")):
+            if stale.exists():
+                stale.unlink()
+    return version
+
+
+def read_snapshot(name):
+    """Текущий снимок каталога с диска или None, если его ещё не собрали."""
+    version_path = catalogue_root() / f"{name}.version"
+    try:
+        version = version_path.read_text()
+    except FileNotFoundError:
+        return None
+    snapshot = _cache.get(name)
+    if snapshot is None or snapshot.version != version:
+        path = catalogue_root() / f"{name}.{version}.json"
+        try:
+            snapshot = Snapshot(version, path.read_bytes(),
+                                path.with_name(path.name + ".gz").read_bytes())
+        except FileNotFoundError:
+            return None
+        _cache[name] = snapshot
+    return snapshot
+
+
+def accepts_gzip(header):
+    """Разрешает ли заголовок Accept-Encoding ответ в gzip.
+
+    Учитывается вес q: "gzip;q=0" запрещает gzip, "*" без явного gzip
+    разрешает его с весом "*".
+    """
+    weights = {}
+    for part in header.split(","):
+        coding, *params = part.strip().lower().split(";")
+        quality = 1.0
+        for param in params:
+            name, _, value = param.strip().partition("=")
+            if name == "q":
+                try:
+                    quality = float(value)
+                except ValueError:
+                    quality = 0.0
+        weights[coding.strip()] = quality
+    quality = weights.get("gzip", weights.get("x-gzip", weights.get("*", 0)))
+    return quality > 0
+
+
+def snapshot_response(request, snapshot):
+    etag = f'"{snapshot.version}"'
+    if request.META.get("HTTP_IF_NONE_MATCH") == etag:
+        response = HttpResponseNotModified()
+    elif accepts_gzip(request.META.get("HTTP_ACCEPT_ENCODING", "")):
+        response = HttpResponse(snapshot.compressed,
+                                content_type="application/json")
+        response["Content-Encoding"] = "gzip"
+    else:
+        response = HttpResponse(snapshot.content,
+                                content_type="application/json")
+    response["ETag"] = etag
+    patch_vary_headers(response, ("Accept-Encoding",))
+    return response
+
+
+def schedule_snapshot(name):
+    """Пересобирает снимок после коммита, не чаще раза на транзакцию."""
+    connection = transaction.get_connection()
+    for _, func in connection.run_on_commit:
+        if getattr(func, "catalogue", None) == name:
+            return
+
+    def rebuild():
+        write_snapshot(name)
+
+    rebuild.catalogue = name
+    transaction.on_commit(rebuild)
@@ -0,0 +1,91 @@
+from django.conf import settings
+from django.db import transaction
+
+from .tasks import schedule_purge
+
+RECIPES = "recipes"
+TAGS = "tags"
+INGREDIENTS = "ingredients"
+
+
+def recipe_key(recipe_id):
+    return f"recipe-{recipe_id}"
+
+
+def author_key(author_id):
+    return f"author-{author_id}"
+
+
+def tag_key(tag_id):
+    return f"tag-{tag_id}"
+
+
+def ingredient_key(ingredient_id):
+    return f"ingredient-{ingredient_id}"
+
+
+def recipe_keys(recipes):
+    """Ключи рецептов, их авторов и тегов из вывода RecipeSerializer."""
+    keys = set()
+    for recipe in recipes:
+        keys.add(recipe_key(recipe["id"]))
+        keys.add(author_key(recipe["author"]["id"]))
+        keys.update(tag_key(tag["id"]) for tag in recipe["tags"])
+    return keys
+
+
+class EdgeCacheMixin:
+    """Помечает анонимные GET-ответы ключами для кэша nginx или CDN.
+
+    Ключи передаются в Surrogate-Key (через пробел) и Cache-Tag (через
+    запятую), срок хранения в кэше — в Surrogate-Control и
+    X-Accel-Expires. Ответы авторизованным пользователям не помечаются:
+    в них есть отметки пользователя.
+    """
+    collection_key = None
+    entity_key = None
+
+    def get_surrogate_keys(self, data):
+        if self.action == "retrieve" and data:
+            return {self.entity_key(data["id"])}
+        return {self.collection_key}
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        response = super().finalize_response(
+            request, response, *args, **kwargs)
+        if (request.method in ("GET", "HEAD")
+                and response.status_code == 200
+                and getattr(request, "accepted_renderer", None) is not None
+                and request.accepted_renderer.format == "json"
+                and not request.user.is_authenticated):
+            keys = sorted(self.get_surrogate_keys(
+                getattr(response, "data", None)))
+            response["Surrogate-Key"] = " ".join(keys)
+            response["Cache-Tag"] = ",".join(keys)
+            response["Surrogate-Control"] = (
+                f"max-age={settings.EDGE_CACHE_TTL}")
+            response["X-Accel-Expires"] = str(settings.EDGE_CACHE_TTL)
+        return response
+
+
+def purge(keys):
+    """Очищает кэш по ключам после коммита, одной задачей на транзакцию.
+
+    Без EDGE_CACHE_PURGE_URL ничего не делает: ответы устаревают
+    через EDGE_CACHE_TTL секунд.
+    """
+    keys = set(keys)
+    if not keys or not settings.EDGE_CACHE_PURGE_URL:
+        return
+    connection = transaction.get_connection()
+    for _, func in connection.run_on_commit:
+        pending = getattr(func, "surrogate_keys", None)
+        if pending is not None:
+            pending.update(keys)
+            return
+
+    def send():
+        schedule_purge(send.surrogate_keys)
+
+    send.surrogate_keys = keys
+    transaction.on_commit(send)
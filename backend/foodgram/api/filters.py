@@ -1,4 +1,5 @@
 from django.contrib.auth import get_user_model
+from django.db.models import F
 from django_filters.rest_framework import FilterSet, filters
 from recipes.models import Recipe, Tag
 from rest_framework.filters import SearchFilter
@@ -10,6 +11,22 @@ class IngredientFilter(SearchFilter):
     search_param = "name"
 
 
+class NullsLastOrderingFilter(filters.OrderingFilter):
+    """Рецепты без значения поля (NULL) в конце при любом направлении."""
+
+    def filter(self, qs, value):
+        if not value:
+            return qs
+        ordering = []
+        for param in value:
+            field = self.get_ordering_value(param)
+            if field.startswith("-"):
+                ordering.append(F(field[1:]).desc(nulls_last=True))
+            else:
+                ordering.append(F(field).asc(nulls_last=True))
+        return qs.order_by(*ordering)
+
+
 class RecipeFilter(FilterSet):
     author = filters.ModelChoiceFilter(queryset=User.objects.all())
     tags = filters.ModelMultipleChoiceFilter(
@@ -19,10 +36,17 @@ class RecipeFilter(FilterSet):
     )
     is_favorited = filters.BooleanFilter(method="filter_favorited")
     is_in_shopping_cart = filters.BooleanFilter(method="filter_shopping_cart")
+    max_calories = filters.NumberFilter(
+        field_name="calories_per_serving", lookup_expr="lte")
+    max_price = filters.NumberFilter(
+        field_name="price_per_serving", lookup_expr="lte")
+    ordering = NullsLastOrderingFilter(
+        fields=("pub_date", "calories_per_serving", "price_per_serving"))
 
     class Meta:
         model = Recipe
-        fields = ("tags", "author", "is_favorited", "is_in_shopping_cart")
+        fields = ("tags", "author", "is_favorited", "is_in_shopping_cart",
+                  "max_calories", "max_price")
 
     def filter_favorited(self, queryset, name, value):
         if self.request.user.is_authenticated and value is True:
@@ -0,0 +1,142 @@
+import json
+import re
+
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from recipes.models import Recipe, Tag
+from rest_framework.test import APIClient
+from users.models import User
+
+# Запросы, которые нагрузочный тест шлёт к API.
+WORKLOAD = (
+    "/api/recipes/",
+    "/api/recipes/?page={last_page}",
+    "/api/recipes/?tags={tag}",
+    "/api/recipes/?author={author}",
+    "/api/recipes/?is_favorited=1",
+    "/api/recipes/?is_in_shopping_cart=1",
+    "/api/recipes/{recipe}/",
+    "/api/recipes/{recipe}/similar/",
+    "/api/recipes/download_shopping_cart/",
+    "/api/ingredients/?name=са",
+    "/api/tags/",
+    "/api/users/",
+    "/api/users/me/",
+    "/api/users/subscriptions/",
+)
+
+# Служебные таблицы ограничения запросов: их запросы есть в каждом ответе
+# и к нагрузке на данные не относятся.
+IGNORED_TABLES = ("api_throttlecounter", "api_admissionslot")
+
+LITERALS = (
+    (re.compile(r"'(?:[^']|'')*'"), "?"),
+    (re.compile(r"\b\d+(?:\.\d+)?\b"), "?"),
+    (re.compile(r"\(\?(?:\s*,\s*\?)*\)"), "(...)"),
+)
+
+
+def query_shape(sql):
+    for pattern, replacement in LITERALS:
+        sql = pattern.sub(replacement, sql)
+    return sql
+
+
+class Command(BaseCommand):
+    help = ("Прогоняет типовую нагрузку на API, снимает EXPLAIN для каждого "
+            "вида запроса и отмечает последовательные сканирования и "
+            "сортировки на диске.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--user", help="email пользователя нагрузки")
+        parser.add_argument("--min-rows", type=int, default=1000,
+                            help="не отмечать сканирования малых таблиц")
+
+    def handle(self, *args, **options):
+        if connection.vendor not in ("postgresql", "sqlite"):
+            raise CommandError("Поддерживаются PostgreSQL и SQLite.")
+        # Нагрузка пишет в базу (списки покупок, задачи), поэтому прогон
+        # и EXPLAIN идут в транзакции, которая затем откатывается.
+        with transaction.atomic():
+            try:
+                self.advise(options["user"], options["min_rows"])
+            finally:
+                transaction.set_rollback(True)
+
+    def advise(self, email, min_rows):
+        queries = self.replay(email)
+        self.stdout.write(f"Видов запросов: {len(queries)}")
+        for shape, (path, sql) in queries.items():
+            if not sql.lstrip().upper().startswith("SELECT"):
+                continue
+            problems = self.explain(sql, min_rows)
+            if problems:
+                self.stdout.write(f"\n{path}\n  {shape}")
+                for problem in problems:
+                    self.stdout.write(f"  ! {problem}")
+
+    def workload_params(self):
+        tag = Tag.objects.values_list("slug", flat=True).first()
+        recipe = Recipe.objects.values_list("id", "author_id").first()
+        if tag is None or recipe is None:
+            raise CommandError("Для нагрузки нужны теги и рецепты.")
+        return {
+            "tag": tag,
+            "recipe": recipe[0],
+            "author": recipe[1],
+            "last_page": max(Recipe.objects.count() - 1, 0) // 6 + 1,
+        }
+
+    def replay(self, email):
+        users = User.objects.all()
+        user = (users.get(email=email) if email
+                else users.filter(shopping_cart__isnull=False).first()
+                or users.first())
+        client = APIClient()
+        client.force_authenticate(user)
+        params = self.workload_params()
+        queries = {}
+        for template in WORKLOAD:
+            path = template.format(**params)
+            with CaptureQueriesContext(connection) as captured:
+                client.get(path)
+            for query in captured.captured_queries:
+                if any(f'"{table}"' in query["sql"]
+                       for table in IGNORED_TABLES):
+                    continue
+                queries.setdefault(query_shape(query["sql"]),
+                                   (path, query["sql"]))
+        return queries
+
+    def explain(self, sql, min_rows):
+        with connection.cursor() as cursor:
+            if connection.vendor == "sqlite":
+                cursor.execute("EXPLAIN QUERY PLAN " + sql)
+                return list(self.sqlite_problems(cursor.fetchall()))
+            cursor.execute("EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) " + sql)
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return list(self.postgres_problems(plan[0]["Plan"], min_rows))
+
+    def postgres_problems(self, node, min_rows):
+        if (node["Node Type"] == "Seq Scan"
+                and node.get("Actual Rows", 0)
+                + node.get("Rows Removed by Filter", 0) >= min_rows):
+            yield (f"Seq Scan по {node['Relation Name']}: "
+                   f"{node.get('Actual Rows')} строк, отброшено "
+                   f"{node.get('Rows Removed by Filter', 0)}")
+        if node.get("Sort Space Type") == "Disk":
+            yield (f"Сортировка на диске: {node.get('Sort Space Used')} КБ "
+                   f"по {', '.join(node.get('Sort Key', []))}")
+        for child in node.get("Plans", ()):
+            yield from self.postgres_problems(child, min_rows)
+
+    def sqlite_problems(self, rows):
+        for row in rows:
+            detail = row[-1]
+            if detail.startswith("SCAN") and "USING" not in detail:
+                yield f"Последовательное сканирование: {detail}"
+            if "TEMP B-TREE" in detail:
+                yield f"Сортировка во временном дереве: {detail}"
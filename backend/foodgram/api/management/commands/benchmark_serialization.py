@@ -0,0 +1,125 @@
+import time
+
+from api.renderers import ORJSONRenderer
+from api.serializers import RecipeSerializer
+from api.snapshots import refresh_snapshots
+from django.core.management import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test.utils import CaptureQueriesContext
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from rest_framework.renderers import JSONRenderer
+from rest_framework.serializers import ListSerializer
+from rest_framework.test import APIRequestFactory
+from users.models import Follow, User
+
+
+class Rollback(Exception):
+    pass
+
+
+class Command(BaseCommand):
+    help = ("Сравнивает время сериализации списка рецептов: вложенные "
+            "сериализаторы и JSONRenderer против RecipeListSerializer "
+            "и ORJSONRenderer без снимков и со снимками Recipe.snapshot. "
+            "Тестовые данные откатываются.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=100)
+        parser.add_argument("--repeat", type=int, default=20)
+
+    def handle(self, *args, **options):
+        try:
+            with transaction.atomic():
+                self.run(options["recipes"], options["repeat"])
+                raise Rollback
+        except Rollback:
+            pass
+
+    def create_data(self, count):
+        reader = User.objects.create(
+            username="bench_reader", email="bench_reader@example.com")
+        User.objects.bulk_create(
+            User(username=f"bench_author_{i}",
+                 email=f"bench_author_{i}@example.com")
+            for i in range(10))
+        Tag.objects.bulk_create(
+            Tag(name=f"Тег {i}", color="#ffffff", slug=f"bench-tag-{i}")
+            for i in range(5))
+        Ingredient.objects.bulk_create(
+            Ingredient(name=f"bench ингредиент {i}", measurement_unit="г")
+            for i in range(50))
+        # bulk_create не везде проставляет pk, поэтому перечитываем.
+        authors = list(User.objects.filter(
+            username__startswith="bench_author_"))
+        tags = list(Tag.objects.filter(slug__startswith="bench-tag-"))
+        ingredients = list(Ingredient.objects.filter(
+            name__startswith="bench ингредиент "))
+        Recipe.objects.bulk_create(
+            Recipe(author=authors[i % len(authors)], name=f"bench рецепт {i}",
+                   text="Описание рецепта", cooking_time=i + 1,
+                   image="upload/bench.png")
+            for i in range(count))
+        recipes = list(Recipe.objects.filter(
+            name__startswith="bench рецепт "))
+        Recipe.tags.through.objects.bulk_create(
+            Recipe.tags.through(recipe=recipe, tag=tags[(i + j) % len(tags)])
+            for i, recipe in enumerate(recipes) for j in range(2))
+        RecipeIngredient.objects.bulk_create(
+            RecipeIngredient(
+                recipe=recipe,
+                ingredient=ingredients[(i * 7 + j) % len(ingredients)],
+                amount=j + 1)
+            for i, recipe in enumerate(recipes) for j in range(8))
+        Favorite.objects.bulk_create(
+            Favorite(user=reader, recipe=recipe) for recipe in recipes[::3])
+        ShoppingCart.objects.bulk_create(
+            ShoppingCart(user=reader, recipe=recipe)
+            for recipe in recipes[::4])
+        Follow.objects.bulk_create(
+            Follow(user=reader, author=author) for author in authors[::2])
+        return reader, recipes
+
+    def measure(self, render, repeat):
+        with CaptureQueriesContext(connection) as queries:
+            content = render()
+        started = time.perf_counter()
+        for _ in range(repeat):
+            render()
+        elapsed = (time.perf_counter() - started) / repeat
+        return content, elapsed, len(queries)
+
+    def run(self, count, repeat):
+        reader, recipes = self.create_data(count)
+        request = APIRequestFactory().get("/api/recipes/")
+        request.user = reader
+        context = {"request": request}
+
+        def render_old():
+            data = ListSerializer(child=RecipeSerializer(),
+                                  instance=recipes, context=context).data
+            return JSONRenderer().render(data)
+
+        def render_new():
+            data = RecipeSerializer(recipes, many=True, context=context).data
+            return ORJSONRenderer().render(data)
+
+        old, old_time, old_queries = self.measure(render_old, repeat)
+        new, new_time, new_queries = self.measure(render_new, repeat)
+        refresh_snapshots([recipe.id for recipe in recipes])
+        fresh = Recipe.objects.in_bulk([recipe.id for recipe in recipes])
+        recipes[:] = [fresh[recipe.id] for recipe in recipes]
+        snap, snap_time, snap_queries = self.measure(render_new, repeat)
+        if not old == new == snap:
+            raise CommandError("Вывод сериализаторов различается.")
+        per_100 = 100 / count * 1000
+        self.stdout.write(
+            f"{count} рецептов, {len(old)} байт, вывод совпадает\n"
+            f"старый: {old_time * per_100:.2f} мс на 100 рецептов, "
+            f"{old_queries} запросов\n"
+            f"новый:  {new_time * per_100:.2f} мс на 100 рецептов, "
+            f"{new_queries} запросов\n"
+            f"снимки: {snap_time * per_100:.2f} мс на 100 рецептов, "
+            f"{snap_queries} запросов\n"
+            f"ускорение: {old_time / new_time:.1f}x, "
+            f"со снимками {old_time / snap_time:.1f}x")
@@ -0,0 +1,20 @@
+from api.catalogue import CATALOGUES, write_snapshot
+from django.core.management import BaseCommand, CommandError
+
+
+class Command(BaseCommand):
+    help = ("Собирает сжатые версионные JSON-снимки каталогов тегов и "
+            "ингредиентов для раздачи через nginx.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("names", nargs="*",
+                            help=f"Каталоги: {', '.join(CATALOGUES)}")
+
+    def handle(self, *args, **options):
+        names = options["names"] or list(CATALOGUES)
+        unknown = set(names) - set(CATALOGUES)
+        if unknown:
+            raise CommandError(f"Неизвестные каталоги: {', '.join(unknown)}")
+        for name in names:
+            version = write_snapshot(name)
+            self.stdout.write(f"{name}: {version}")
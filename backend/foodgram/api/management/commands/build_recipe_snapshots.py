@@ -0,0 +1,28 @@
+from api.snapshots import BATCH_SIZE, refresh_snapshots
+from django.core.management import BaseCommand
+from recipes.models import Recipe
+
+
+class Command(BaseCommand):
+    help = ("Пересобирает JSON-снимки рецептов (Recipe.snapshot), из "
+            "которых API отдаёт рецепты. По умолчанию только пустые.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="пересобрать снимки всех рецептов")
+
+    def handle(self, *args, **options):
+        recipes = Recipe.objects.order_by("id")
+        if not options["all"]:
+            recipes = recipes.filter(snapshot="")
+        last_id = 0
+        rebuilt = 0
+        while True:
+            batch = list(recipes.filter(id__gt=last_id).values_list(
+                "id", flat=True)[:BATCH_SIZE])
+            if not batch:
+                break
+            refresh_snapshots(batch)
+            last_id = batch[-1]
+            rebuilt += len(batch)
+        self.stdout.write(f"Пересобрано снимков: {rebuilt}")
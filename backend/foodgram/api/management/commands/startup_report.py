@@ -0,0 +1,102 @@
+import json
+import os
+import re
+import subprocess
+import sys
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+
+# Запускается в отдельном интерпретаторе, чтобы импорт был холодным:
+# повторяет загрузку воркера gunicorn и первый запрос (URLconf).
+BOOT_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+phases = []
+
+def mark(name):
+    phases.append((name, time.perf_counter()))
+
+import django
+from django.conf import settings
+settings.INSTALLED_APPS
+mark("settings")
+django.setup(set_prefix=False)
+mark("apps")
+from django.core.wsgi import get_wsgi_application
+get_wsgi_application()
+mark("wsgi")
+from django.urls import get_resolver
+get_resolver().url_patterns
+mark("urls")
+previous = start
+result = []
+for name, moment in phases:
+    result.append((name, moment - previous))
+    previous = moment
+print(json.dumps({"phases": result, "total": previous - start,
+                  "modules": sorted(sys.modules)}))
+"""
+
+PHASES = {
+    "settings": "Импорт Django и настроек",
+    "apps": "Реестр приложений (apps.populate, ready())",
+    "wsgi": "WSGI-приложение и middleware",
+    "urls": "URLconf: views, сериализаторы, фильтры",
+}
+
+# Модули, которые нужны только отдельным запросам и задачам.
+LAZY_MODULES = ("PIL", "numpy", "scipy", "rest_framework_simplejwt")
+
+IMPORT_LINE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \|( *)(\S+)$")
+
+
+class Command(BaseCommand):
+    help = ("Холодный старт воркера: время этапов загрузки Django "
+            "и самые дорогие импорты модулей.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--top", type=int, default=20,
+                            help="сколько модулей и пакетов вывести")
+
+    def handle(self, *args, **options):
+        env = dict(os.environ,
+                   DJANGO_SETTINGS_MODULE=settings.SETTINGS_MODULE)
+        process = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", BOOT_SCRIPT],
+            cwd=settings.BASE_DIR, env=env,
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+            universal_newlines=True,
+        )
+        if process.returncode:
+            raise CommandError(process.stderr[-2000:])
+        boot = json.loads(process.stdout.strip().splitlines()[-1])
+        imports = [match.groups() for match in map(
+            IMPORT_LINE.match, process.stderr.splitlines()) if match]
+
+        self.stdout.write("Этапы загрузки, мс:")
+        for name, seconds in boot["phases"]:
+            self.stdout.write(f"  {PHASES[name]:<45} {seconds * 1000:8.1f}")
+        self.stdout.write(f"  {'Всего':<45} {boot['total'] * 1000:8.1f}")
+
+        top = options["top"]
+        self.stdout.write("\nСамые дорогие импорты с зависимостями, мс:")
+        for own, total, indent, name in sorted(
+                imports, key=lambda row: -int(row[1]))[:top]:
+            self.stdout.write(f"  {name:<55} {int(total) / 1000:8.1f}")
+
+        packages = defaultdict(int)
+        for own, total, indent, name in imports:
+            packages[name.split(".")[0]] += int(own)
+        self.stdout.write("\nСобственное время импорта по пакетам, мс:")
+        for name, own in sorted(packages.items(),
+                                key=lambda item: -item[1])[:top]:
+            self.stdout.write(f"  {name:<55} {own / 1000:8.1f}")
+
+        loaded = sorted({name.split(".")[0] for name in boot["modules"]}
+                        & set(LAZY_MODULES))
+        if loaded:
+            self.stdout.write(self.style.WARNING(
+                "\nПри старте загружены модули, которые должны "
+                "подключаться лениво: " + ", ".join(loaded)))
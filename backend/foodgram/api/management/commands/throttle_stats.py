@@ -0,0 +1,17 @@
+from api.throttling import rejection_counts, reset_rejection_counts
+from django.core.management import BaseCommand
+
+
+class Command(BaseCommand):
+    help = ("Выводит число запросов, отклонённых ограничением частоты (429) "
+            "и контролем нагрузки (503).")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--reset", action="store_true",
+                            help="обнулить счётчики после вывода")
+
+    def handle(self, *args, **options):
+        for kind, count in rejection_counts().items():
+            self.stdout.write(f"{kind}: {count}")
+        if options["reset"]:
+            reset_rejection_counts()
@@ -0,0 +1,47 @@
+from django.db import models
+
+
+class ThrottleCounter(models.Model):
+    """Общий для всех воркеров счётчик ограничения запросов.
+
+    Меняется только под блокировкой строки (select_for_update), поэтому
+    одновременные запросы не теряют приращения. После expires счётчик
+    начинается с нуля.
+    """
+    key = models.CharField(
+        verbose_name="Ключ",
+        max_length=200,
+        unique=True,
+    )
+    value = models.PositiveIntegerField(
+        verbose_name="Значение",
+        default=0,
+    )
+    expires = models.DateTimeField(
+        verbose_name="Действует до",
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        verbose_name = "Счётчик ограничения запросов"
+        verbose_name_plural = "Счётчики ограничения запросов"
+
+    def __str__(self):
+        return f"{self.key}: {self.value}"
+
+
+class AdmissionSlot(models.Model):
+    """Слот выполняющегося дорогого запроса.
+
+    Слот упавшего воркера не освобождается явно и перестаёт учитываться
+    после expires.
+    """
+    expires = models.DateTimeField(
+        verbose_name="Действует до",
+        db_index=True,
+    )
+
+    class Meta:
+        verbose_name = "Слот дорогого запроса"
+        verbose_name_plural = "Слоты дорогих запросов"
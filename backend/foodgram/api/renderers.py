@@ -0,0 +1,34 @@
+from rest_framework.renderers import JSONRenderer
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+
+class ORJSONRenderer(JSONRenderer):
+    """JSONRenderer с быстрым путём через orjson.
+
+    Вывод побайтно совпадает с JSONRenderer в компактном режиме: ключи
+    не-строки приводятся к строкам, даты и Decimal проходят через
+    encoder_class. Если orjson не установлен, запрошен отступ или
+    отключён STRICT_JSON, работает обычный рендерер: orjson не умеет
+    писать NaN и заменяет его на null.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if (orjson is None or not self.compact or self.ensure_ascii
+                or not self.strict):
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        if data is None:
+            return b""
+        if self.get_indent(accepted_media_type,
+                           renderer_context or {}) is not None:
+            return super().render(data, accepted_media_type,
+                                  renderer_context)
+        ret = orjson.dumps(
+            data, default=self.encoder_class().default,
+            option=orjson.OPT_NON_STR_KEYS | orjson.OPT_PASSTHROUGH_DATETIME)
+        return (ret.replace("\u2028".encode(), b"\\u2028")
+                .replace("\u2029".encode(), b"\\u2029"))
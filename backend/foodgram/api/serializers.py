@@ -1,13 +1,22 @@
 import base64
+import json
 
 from django.contrib.auth import get_user_model
 from django.core.files.base import ContentFile
+from django.db import transaction
+from django.db.models import Manager, QuerySet
 from django.shortcuts import get_object_or_404
 from djoser.serializers import UserCreateSerializer, UserSerializer
-from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+from events.models import Event
+from events.outbox import collect_events
+from recipes.models import (Household, HouseholdInvite, HouseholdMember,
+                            Ingredient, Recipe, RecipeIngredient, ShoppingCart,
+                            Tag)
 from rest_framework import serializers
 from rest_framework.validators import UniqueTogetherValidator
 
+from .snapshots import collect_snapshots, refresh_snapshots, represent
+
 User = get_user_model()
 
 
@@ -39,11 +48,9 @@ class CustomUserSerializer(UserSerializer):
                   "is_subscribed")
 
     def get_is_subscribed(self, obj):
-        user = get_object_or_404(
-            User,
-            username=self.context["request"].user
-        )
-        return user.follower.filter(author=obj.id).exists()
+        user = self.context["request"].user
+        return user.is_authenticated and user.follower.filter(
+            author=obj.id).exists()
 
 
 class RecipeShortSerializer(serializers.ModelSerializer):
@@ -81,16 +88,31 @@ class SubscriptionSerializer(serializers.ModelSerializer):
         return user.follower.filter(author=obj.id).exists()
 
 
+class ValuesListSerializer(serializers.ListSerializer):
+    """Список плоских объектов прямо из .values() без полей сериализатора."""
+
+    def to_representation(self, data):
+        fields = self.child.Meta.fields
+        if isinstance(data, Manager):
+            data = data.all()
+        if isinstance(data, QuerySet):
+            return list(data.values(*fields))
+        return [{field: getattr(obj, field) for field in fields}
+                for obj in data]
+
+
 class TagSerializer(serializers.ModelSerializer):
     class Meta:
         model = Tag
         fields = ("id", "name", "color", "slug")
+        list_serializer_class = ValuesListSerializer
 
 
 class IngredientSerializer(serializers.ModelSerializer):
     class Meta:
         model = Ingredient
         fields = ("id", "name", "measurement_unit")
+        list_serializer_class = ValuesListSerializer
         validators = [
             UniqueTogetherValidator(
                 queryset=Ingredient.objects.all(),
@@ -113,6 +135,21 @@ class RecipeIngredientSerializer(serializers.ModelSerializer):
         fields = ("id", "name", "measurement_unit", "amount")
 
 
+class RecipeListSerializer(serializers.ListSerializer):
+    """Список рецептов в формате RecipeSerializer.
+
+    Не зависящая от пользователя часть берётся из Recipe.snapshot (или
+    собирается для всей страницы несколькими запросами .values()), к ней
+    добавляются отметки пользователя.
+    """
+
+    def to_representation(self, data):
+        recipes = list(data)
+        if not recipes:
+            return []
+        return represent(recipes, self.context.get("request"))
+
+
 class RecipeSerializer(serializers.ModelSerializer):
     tags = TagSerializer(read_only=True, many=True)
     ingredients = RecipeIngredientSerializer(
@@ -132,9 +169,15 @@ class RecipeSerializer(serializers.ModelSerializer):
         model = Recipe
         fields = (
             "id", "tags", "author", "ingredients",
-            "name", "text", "cooking_time", "image",
+            "name", "text", "cooking_time", "servings", "image",
             "is_favorited", "is_in_shopping_cart"
         )
+        list_serializer_class = RecipeListSerializer
+
+    def to_representation(self, instance):
+        if instance.snapshot:
+            return represent([instance], self.context.get("request"))[0]
+        return super().to_representation(instance)
 
     def get_is_favorited(self, obj):
         user = self.context['request'].user
@@ -143,7 +186,7 @@ class RecipeSerializer(serializers.ModelSerializer):
 
     def get_is_in_shopping_cart(self, obj):
         user = self.context['request'].user
-        return user.is_authenticated and user.cart.filter(
+        return user.is_authenticated and user.shopping_cart.filter(
             recipe=obj.id).exists()
 
 
@@ -153,6 +196,12 @@ class RecipeCreateSerializer(RecipeSerializer):
         queryset=Tag.objects.all()
     )
     image = Base64ImageField()
+    servings = serializers.IntegerField(
+        min_value=1,
+        required=False,
+        error_messages={
+            "min_value": "Количество порций не может быть меньше 1."},
+    )
 
     def to_representation(self, instance):
         request = self.context.get("request")
@@ -165,8 +214,8 @@ class RecipeCreateSerializer(RecipeSerializer):
     class Meta:
         model = Recipe
         fields = ("id", "tags", "author", "ingredients", "name",
-                  "image", "text", "cooking_time", "is_favorited",
-                  "is_in_shopping_cart")
+                  "image", "text", "cooking_time", "servings",
+                  "is_favorited", "is_in_shopping_cart")
         validators = [
             UniqueTogetherValidator(
                 queryset=Recipe.objects.all(),
@@ -205,27 +254,98 @@ class RecipeCreateSerializer(RecipeSerializer):
             ingredients_list.append(ingredient["ingredient"]["id"])
         return data
 
+    @transaction.atomic
     def create(self, validated_data):
         author = self.context["request"].user
         ingredients = validated_data.pop("recipe_ingredient")
         tags = validated_data.pop("tags")
-        recipe = Recipe.objects.create(**validated_data, author=author)
-        recipe.tags.add(*tags)
-        self.save_ingredients(recipe, ingredients)
+        with collect_snapshots(), collect_events():
+            recipe = Recipe.objects.create(**validated_data, author=author)
+            recipe.tags.add(*tags)
+            self.save_ingredients(recipe, ingredients)
+            refresh_snapshots([recipe.id])
+        recipe.refresh_from_db(fields=["snapshot"])
         return recipe
 
+    @transaction.atomic
     def update(self, instance, validated_data):
         instance.name = validated_data.get("name", instance.name)
         instance.text = validated_data.get("text", instance.text)
         instance.image = validated_data.get("image", instance.image)
         instance.cooking_time = validated_data.get(
             "cooking_time", instance.cooking_time)
+        instance.servings = validated_data.get(
+            "servings", instance.servings)
         ingredients = validated_data.pop("recipe_ingredient")
         tags = validated_data.pop("tags")
-        instance.tags.clear()
-        instance.tags.add(*tags)
-        instance.ingredients.clear()
-        recipe = instance
-        self.save_ingredients(recipe, ingredients)
-        instance.save()
+        with collect_snapshots(), collect_events():
+            instance.tags.clear()
+            instance.tags.add(*tags)
+            instance.ingredients.clear()
+            recipe = instance
+            self.save_ingredients(recipe, ingredients)
+            instance.save()
+            refresh_snapshots([instance.id])
+        instance.refresh_from_db(fields=["snapshot"])
         return instance
+
+
+class ShoppingCartSerializer(serializers.ModelSerializer):
+    """Порции рецепта в корзине, пусто — как в рецепте."""
+
+    class Meta:
+        model = ShoppingCart
+        fields = ("servings",)
+
+
+class HouseholdMemberSerializer(serializers.ModelSerializer):
+    id = serializers.ReadOnlyField(source="user.id")
+    username = serializers.ReadOnlyField(source="user.username")
+    first_name = serializers.ReadOnlyField(source="user.first_name")
+    last_name = serializers.ReadOnlyField(source="user.last_name")
+
+    class Meta:
+        model = HouseholdMember
+        fields = ("id", "username", "first_name", "last_name")
+
+
+class HouseholdInviteSerializer(HouseholdMemberSerializer):
+
+    class Meta:
+        model = HouseholdInvite
+        fields = ("id", "username", "first_name", "last_name")
+
+
+class HouseholdSerializer(serializers.ModelSerializer):
+    owner = serializers.ReadOnlyField(source="owner.id")
+    members = HouseholdMemberSerializer(many=True, read_only=True)
+    invites = HouseholdInviteSerializer(many=True, read_only=True)
+
+    class Meta:
+        model = Household
+        fields = ("id", "name", "owner", "members", "invites")
+
+
+class HouseholdMemberCreateSerializer(serializers.Serializer):
+    user = serializers.PrimaryKeyRelatedField(queryset=User.objects.all())
+
+    def validate_user(self, user):
+        if HouseholdMember.objects.filter(user=user).exists():
+            raise serializers.ValidationError(
+                "Пользователь уже состоит в семье")
+        if HouseholdInvite.objects.filter(
+                household=self.context["household"], user=user).exists():
+            raise serializers.ValidationError(
+                "Пользователь уже приглашён")
+        return user
+
+
+class EventSerializer(serializers.ModelSerializer):
+    data = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Event
+        fields = ("id", "created", "entity", "entity_id", "action", "data")
+
+    def get_data(self, obj):
+        return json.loads(obj.data)
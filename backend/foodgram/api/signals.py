@@ -0,0 +1,95 @@
+from django.contrib.auth import get_user_model
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+from recipes.models import Ingredient, Recipe, RecipeIngredient, Tag
+
+from .catalogue import schedule_snapshot
+from .edge_cache import (INGREDIENTS, RECIPES, TAGS, author_key,
+                         ingredient_key, purge, recipe_key, tag_key)
+from .snapshots import AUTHOR_FIELDS, refresh_snapshots
+from .tasks import schedule_snapshots
+
+User = get_user_model()
+
+
+@receiver((post_save, post_delete), sender=Tag)
+def tags_changed(sender, instance, **kwargs):
+    schedule_snapshot("tags")
+    # Ключ тега стоит и на рецептах с этим тегом.
+    purge([TAGS, tag_key(instance.pk)])
+
+
+@receiver((post_save, post_delete), sender=Ingredient)
+def ingredients_changed(sender, instance, **kwargs):
+    schedule_snapshot("ingredients")
+    purge([INGREDIENTS, ingredient_key(instance.pk)])
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, **kwargs):
+    refresh_snapshots([instance.pk])
+    # Изменённый рецепт может войти в отфильтрованные списки или выйти
+    # из них, поэтому очищаются и все списки рецептов.
+    purge([RECIPES, recipe_key(instance.pk)])
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_removed(sender, instance, **kwargs):
+    purge([RECIPES, recipe_key(instance.pk)])
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action in ("post_add", "post_remove", "post_clear"):
+            refresh_snapshots([instance.pk])
+            purge([RECIPES, recipe_key(instance.pk)])
+    elif action in ("post_add", "post_remove"):
+        refresh_snapshots(pk_set)
+        purge([RECIPES, *map(recipe_key, pk_set)])
+    elif action == "pre_clear":
+        instance._snapshot_recipes = list(
+            instance.recipes.values_list("id", flat=True))
+    elif action == "post_clear":
+        refresh_snapshots(instance._snapshot_recipes)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    refresh_snapshots([instance.recipe_id])
+    purge([recipe_key(instance.recipe_id)])
+
+
+# Тег, ингредиент или автор могут стоять на тысячах рецептов, поэтому
+# их снимки пересобирает задача, а не запрос, изменивший запись.
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    if not created:
+        schedule_snapshots(instance.recipes.values_list("id", flat=True))
+
+
+@receiver(pre_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    instance._snapshot_recipes = list(
+        instance.recipes.values_list("id", flat=True))
+
+
+@receiver(post_delete, sender=Tag)
+def tag_removed(sender, instance, **kwargs):
+    schedule_snapshots(instance._snapshot_recipes)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, **kwargs):
+    if not created:
+        schedule_snapshots(instance.recipes.values_list("id", flat=True))
+
+
+@receiver(post_save, sender=User)
+def author_saved(sender, instance, created, update_fields, **kwargs):
+    if created or (update_fields is not None
+                   and not set(update_fields) & set(AUTHOR_FIELDS)):
+        return
+    schedule_snapshots(instance.recipes.values_list("id", flat=True))
+    purge([author_key(instance.pk)])
@@ -0,0 +1,176 @@
+import json
+import threading
+from collections import defaultdict
+from contextlib import contextmanager
+
+from django.contrib.auth import get_user_model
+from django.db.models import Exists, OuterRef
+from recipes.models import Favorite, Recipe, RecipeIngredient, ShoppingCart
+from users.models import Follow
+
+User = get_user_model()
+
+AUTHOR_FIELDS = ("email", "id", "username", "first_name", "last_name")
+BATCH_SIZE = 500
+
+_state = threading.local()
+
+
+def build_snapshots(recipes):
+    """Не зависящая от пользователя часть вывода RecipeSerializer.
+
+    Теги, ингредиенты и авторы всех рецептов читаются тремя запросами.
+    Картинка хранится относительным URL, полный адрес строится при ответе.
+    """
+    recipe_ids = [recipe.id for recipe in recipes]
+    tags = defaultdict(list)
+    for row in Recipe.tags.through.objects.filter(
+            recipe_id__in=recipe_ids).order_by(
+            "tag__name", "tag_id").values(
+            "recipe_id", "tag_id", "tag__name", "tag__color", "tag__slug"):
+        tags[row["recipe_id"]].append({
+            "id": row["tag_id"],
+            "name": row["tag__name"],
+            "color": row["tag__color"],
+            "slug": row["tag__slug"],
+        })
+
+    ingredients = defaultdict(list)
+    for row in RecipeIngredient.objects.filter(
+            recipe_id__in=recipe_ids).order_by("id").values(
+            "recipe_id", "ingredient_id", "ingredient__name",
+            "ingredient__measurement_unit", "amount"):
+        ingredients[row["recipe_id"]].append({
+            "id": row["ingredient_id"],
+            "name": row["ingredient__name"],
+            "measurement_unit": row["ingredient__measurement_unit"],
+            "amount": row["amount"],
+        })
+
+    authors = {
+        row["id"]: row for row in User.objects.filter(
+            id__in={recipe.author_id for recipe in recipes}).values(
+            *AUTHOR_FIELDS)
+    }
+    return {
+        recipe.id: {
+            "id": recipe.id,
+            "tags": tags[recipe.id],
+            "author": authors[recipe.author_id],
+            "ingredients": ingredients[recipe.id],
+            "name": recipe.name,
+            "text": recipe.text,
+            "cooking_time": recipe.cooking_time,
+            "servings": recipe.servings,
+            "image": recipe.image.url if recipe.image else None,
+        }
+        for recipe in recipes
+    }
+
+
+def load_snapshots(recipes):
+    """Снимки рецептов из колонки snapshot, недостающие собираются."""
+    snapshots = {recipe.id: json.loads(recipe.snapshot)
+                 for recipe in recipes if recipe.snapshot}
+    missing = [recipe for recipe in recipes if recipe.id not in snapshots]
+    if missing:
+        snapshots.update(build_snapshots(missing))
+    return snapshots
+
+
+def refresh_snapshots(recipe_ids):
+    """Пересобирает снимки рецептов пачками в текущей транзакции.
+
+    Внутри collect_snapshots() только запоминает id, чтобы несколько
+    изменений одного рецепта дали одну пересборку.
+    """
+    pending = getattr(_state, "pending", None)
+    if pending is not None:
+        pending.update(recipe_ids)
+        return
+    recipe_ids = list(recipe_ids)
+    for start in range(0, len(recipe_ids), BATCH_SIZE):
+        recipes = list(Recipe.objects.filter(
+            id__in=recipe_ids[start:start + BATCH_SIZE]).only(
+            "id", "author_id", "name", "text", "cooking_time", "servings",
+            "image"))
+        snapshots = build_snapshots(recipes)
+        for recipe in recipes:
+            recipe.snapshot = json.dumps(
+                snapshots[recipe.id], ensure_ascii=False,
+                separators=(",", ":"))
+        Recipe.objects.bulk_update(recipes, ["snapshot"])
+
+
+@contextmanager
+def collect_snapshots():
+    """Откладывает пересборку снимков до конца блока."""
+    if getattr(_state, "pending", None) is not None:
+        yield
+        return
+    _state.pending = set()
+    try:
+        yield
+        pending = _state.pending
+    finally:
+        _state.pending = None
+    refresh_snapshots(pending)
+
+
+def with_user_flags(queryset, user):
+    """Добавляет к рецептам отметки пользователя подзапросами EXISTS."""
+    if not user.is_authenticated:
+        return queryset
+    return queryset.annotate(
+        user_favorited=Exists(Favorite.objects.filter(
+            user=user, recipe=OuterRef("pk"))),
+        user_in_cart=Exists(ShoppingCart.objects.filter(
+            user=user, recipe=OuterRef("pk"))),
+        user_subscribed=Exists(Follow.objects.filter(
+            user=user, author=OuterRef("author"))),
+    )
+
+
+def user_flags(recipes, user):
+    """Множества id рецептов в избранном и корзине и id авторов в подписках.
+
+    Берутся из аннотаций with_user_flags, а без них тремя запросами.
+    """
+    if user is None or not user.is_authenticated:
+        return set(), set(), set()
+    if all(hasattr(recipe, "user_favorited") for recipe in recipes):
+        return (
+            {recipe.id for recipe in recipes if recipe.user_favorited},
+            {recipe.id for recipe in recipes if recipe.user_in_cart},
+            {recipe.author_id for recipe in recipes
+             if recipe.user_subscribed},
+        )
+    recipe_ids = [recipe.id for recipe in recipes]
+    return (
+        set(user.favorite.filter(
+            recipe_id__in=recipe_ids).values_list("recipe_id", flat=True)),
+        set(user.shopping_cart.filter(
+            recipe_id__in=recipe_ids).values_list("recipe_id", flat=True)),
+        set(user.follower.filter(
+            author_id__in={recipe.author_id for recipe in recipes},
+        ).values_list("author_id", flat=True)),
+    )
+
+
+def represent(recipes, request):
+    """Вывод RecipeSerializer для рецептов: снимки и отметки пользователя."""
+    user = request.user if request is not None else None
+    snapshots = load_snapshots(recipes)
+    favorited, in_cart, subscribed = user_flags(recipes, user)
+    result = []
+    for recipe in recipes:
+        data = snapshots[recipe.id]
+        data["author"] = dict(
+            data["author"],
+            is_subscribed=recipe.author_id in subscribed)
+        if data["image"] is not None and request is not None:
+            data["image"] = request.build_absolute_uri(data["image"])
+        data["is_favorited"] = recipe.id in favorited
+        data["is_in_shopping_cart"] = recipe.id in in_cart
+        result.append(data)
+    return result
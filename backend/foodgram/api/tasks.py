@@ -0,0 +1,54 @@
+import json
+from urllib.request import Request, urlopen
+
+from django.conf import settings
+from tasks.queue import enqueue, task
+
+# Cloudflare принимает не больше 30 ключей за запрос.
+PURGE_BATCH_SIZE = 30
+PURGE_TIMEOUT = 10
+
+
+@task()
+def purge_surrogate_keys(keys):
+    """Отправляет ключи на EDGE_CACHE_PURGE_URL.
+
+    Ключи передаются и заголовком Surrogate-Key (Fastly, Varnish xkey),
+    и телом {"tags": [...]} (Cloudflare). Ошибка HTTP вызывает повтор
+    задачи.
+    """
+    headers = {"Content-Type": "application/json"}
+    if settings.EDGE_CACHE_PURGE_TOKEN:
+        headers["Authorization"] = f"Bearer {settings.EDGE_CACHE_PURGE_TOKEN}"
+    for start in range(0, len(keys), PURGE_BATCH_SIZE):
+        batch = keys[start:start + PURGE_BATCH_SIZE]
+        request = Request(
+            settings.EDGE_CACHE_PURGE_URL,
+            data=json.dumps({"tags": batch}).encode(),
+            headers=dict(headers, **{"Surrogate-Key": " ".join(batch)}),
+            method="POST",
+        )
+        with urlopen(request, timeout=PURGE_TIMEOUT):
+            pass
+
+
+def schedule_purge(keys):
+    enqueue(purge_surrogate_keys, keys=sorted(keys))
+
+
+@task()
+def build_recipe_snapshots(recipe_ids):
+    """Пересобирает снимки рецептов и очищает их кэш.
+
+    Кэш очищается после пересборки, чтобы CDN не сохранил старый снимок.
+    """
+    from .edge_cache import purge, recipe_key
+    from .snapshots import refresh_snapshots
+    refresh_snapshots(recipe_ids)
+    purge(map(recipe_key, recipe_ids))
+
+
+def schedule_snapshots(recipe_ids):
+    recipe_ids = sorted(set(recipe_ids))
+    if recipe_ids:
+        enqueue(build_recipe_snapshots, recipe_ids=recipe_ids)
@@ -0,0 +1,94 @@
+from datetime import date, datetime, timedelta, timezone
+from decimal import Decimal
+
+from django.test import SimpleTestCase
+from recipes.models import (Household, HouseholdMember, Ingredient, Recipe,
+                            RecipeIngredient, ShoppingCart)
+from rest_framework import status
+from rest_framework.renderers import JSONRenderer
+from rest_framework.test import APITestCase
+from users.models import User
+
+from .renderers import ORJSONRenderer
+
+
+class HouseholdInviteTests(APITestCase):
+
+    def setUp(self):
+        self.owner = User.objects.create_user(
+            username="owner", email="owner@example.com", password="pass")
+        self.guest = User.objects.create_user(
+            username="guest", email="guest@example.com", password="pass")
+        salt = Ingredient.objects.create(name="соль", measurement_unit="г")
+        recipe = Recipe.objects.create(
+            author=self.guest, name="Суп", text="Суп", cooking_time=10,
+            image="upload/soup.png")
+        RecipeIngredient.objects.create(
+            recipe=recipe, ingredient=salt, amount=5)
+        ShoppingCart.objects.create(user=self.guest, recipe=recipe)
+        self.client.force_authenticate(self.owner)
+        response = self.client.post("/api/households/", {"name": "Дом"})
+        self.household = Household.objects.get(pk=response.data["id"])
+
+    def download(self):
+        self.client.force_authenticate(self.owner)
+        return self.client.get(
+            "/api/recipes/download_shopping_cart/").content.decode()
+
+    def test_invited_user_is_not_merged_without_consent(self):
+        response = self.client.post(
+            f"/api/households/{self.household.pk}/members/",
+            {"user": self.guest.pk})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(
+            HouseholdMember.objects.filter(user=self.guest).exists())
+        self.assertNotIn("соль", self.download())
+
+        self.client.force_authenticate(self.guest)
+        response = self.client.post("/api/households/", {"name": "Свой"})
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+
+    def test_accepted_invite_merges_cart(self):
+        self.client.post(f"/api/households/{self.household.pk}/members/",
+                         {"user": self.guest.pk})
+        self.client.force_authenticate(self.guest)
+        response = self.client.get("/api/households/invites/")
+        self.assertEqual([item["id"] for item in response.data],
+                         [self.household.pk])
+        response = self.client.post(
+            f"/api/households/{self.household.pk}/join/")
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertIn("соль", self.download())
+
+    def test_declined_invite_is_removed(self):
+        self.client.post(f"/api/households/{self.household.pk}/members/",
+                         {"user": self.guest.pk})
+        self.client.force_authenticate(self.guest)
+        response = self.client.delete(
+            f"/api/households/{self.household.pk}/join/")
+        self.assertEqual(response.status_code, status.HTTP_204_NO_CONTENT)
+        self.assertFalse(self.household.invites.exists())
+        self.assertNotIn("соль", self.download())
+
+
+class ORJSONRendererTests(SimpleTestCase):
+    data = {
+        1: {"calories": Decimal("12.50"), 2.5: None, True: "да"},
+        "pub_date": datetime(2021, 5, 1, 10, 30, 15, 123456,
+                             tzinfo=timezone.utc),
+        "moscow": datetime(2021, 5, 1, 13, 30,
+                           tzinfo=timezone(timedelta(hours=3))),
+        "naive": datetime(2021, 5, 1, 10, 30),
+        "date": date(2021, 5, 1),
+        "text": "Борщ\u2028",
+    }
+
+    def test_output_matches_json_renderer(self):
+        self.assertEqual(ORJSONRenderer().render(self.data),
+                         JSONRenderer().render(self.data))
+
+    def test_nan_without_strict_json_matches_json_renderer(self):
+        renderer = ORJSONRenderer()
+        renderer.strict = False
+        self.assertEqual(renderer.render({"calories": float("nan")}),
+                         b'{"calories":NaN}')
@@ -0,0 +1,157 @@
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+from rest_framework import status
+from rest_framework.exceptions import APIException
+from rest_framework.throttling import SimpleRateThrottle
+
+from .models import AdmissionSlot, ThrottleCounter
+
+logger = logging.getLogger(__name__)
+
+REJECTIONS = ("throttled", "overloaded")
+METRICS_KEY = "throttle_rejected_%s"
+ADMISSION_LOCK = "admission_lock"
+
+
+def increment(key, delta=1, timeout=None):
+    """Атомарно увеличивает счётчик и возвращает значение и срок действия.
+
+    Строка счётчика блокируется до конца транзакции, поэтому приращения
+    из разных воркеров не теряются. Срок задаётся при создании счётчика
+    и не продлевается следующими приращениями.
+    """
+    now = timezone.now()
+    expires = now + timedelta(seconds=timeout) if timeout else None
+    with transaction.atomic():
+        counter, created = (
+            ThrottleCounter.objects.select_for_update()
+            .get_or_create(key=key, defaults={"value": 0, "expires": expires})
+        )
+        if created:
+            ThrottleCounter.objects.filter(expires__lte=now).delete()
+        elif counter.expires is not None and counter.expires <= now:
+            counter.value, counter.expires = 0, expires
+        counter.value += delta
+        counter.save(update_fields=("value", "expires"))
+    return counter.value, counter.expires
+
+
+def record_rejection(kind, request, view):
+    """Увеличивает счётчик отказов в общем хранилище и пишет в лог."""
+    increment(METRICS_KEY % kind)
+    logger.warning("Запрос отклонён (%s): %s %s, пользователь %s",
+                   kind, request.method, request.path, request.user.pk)
+
+
+def rejection_counts():
+    counts = dict(ThrottleCounter.objects.filter(
+        key__in=[METRICS_KEY % kind for kind in REJECTIONS],
+    ).values_list("key", "value"))
+    return {kind: counts.get(METRICS_KEY % kind, 0) for kind in REJECTIONS}
+
+
+def reset_rejection_counts():
+    ThrottleCounter.objects.filter(
+        key__in=[METRICS_KEY % kind for kind in REJECTIONS]).delete()
+
+
+def acquire_slot():
+    """Занимает слот дорогого запроса и возвращает его id.
+
+    Возвращает None, если уже занято MAX_EXPENSIVE_REQUESTS слотов.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        # Строка-замок: подсчёт и создание слотов идут по очереди.
+        ThrottleCounter.objects.select_for_update().get_or_create(
+            key=ADMISSION_LOCK)
+        slots = AdmissionSlot.objects.filter(expires__gt=now)
+        if slots.count() >= settings.MAX_EXPENSIVE_REQUESTS:
+            return None
+        AdmissionSlot.objects.filter(expires__lte=now).delete()
+        return AdmissionSlot.objects.create(
+            expires=now + timedelta(seconds=settings.ADMISSION_TIMEOUT)).pk
+
+
+def release_slot(slot_id):
+    AdmissionSlot.objects.filter(pk=slot_id).delete()
+
+
+class CostRateThrottle(SimpleRateThrottle):
+    """Ограничение по стоимости запросов в фиксированном окне.
+
+    Каждый дорогой запрос расходует из бюджета rate столько единиц,
+    сколько вернёт view.get_throttle_cost(request), запросы стоимостью 1
+    не считаются. Окно начинается с первого запроса клиента, счётчики
+    общие для всех воркеров (ThrottleCounter).
+    """
+    scope = "expensive"
+    cache_format = "throttle_%(scope)s_%(ident)s"
+
+    def get_cache_key(self, request, view):
+        if request.user and request.user.is_authenticated:
+            ident = request.user.pk
+        else:
+            ident = self.get_ident(request)
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        get_cost = getattr(view, "get_throttle_cost", None)
+        cost = get_cost(request) if get_cost else 1
+        # Обычные запросы не учитываются: счётчик меняется в основной базе
+        # под блокировкой строки, это дороже самого запроса.
+        if cost <= 1:
+            return True
+        self.key = self.get_cache_key(request, view)
+        used, self.expires = increment(self.key, cost, self.duration)
+        if used > self.num_requests:
+            record_rejection("throttled", request, view)
+            return False
+        return True
+
+    def wait(self):
+        return max((self.expires - timezone.now()).total_seconds(), 0)
+
+
+class Overloaded(APIException):
+    status_code = status.HTTP_503_SERVICE_UNAVAILABLE
+    default_detail = "Сервер перегружен, повторите запрос позже."
+    default_code = "overloaded"
+
+    def __init__(self, wait):
+        super().__init__()
+        self.wait = wait
+
+
+class AdmissionControlMixin:
+    """Ограничивает число одновременных дорогих запросов во всех воркерах.
+
+    Дорогими считаются запросы со стоимостью не меньше
+    EXPENSIVE_REQUEST_COST. Сверх бюджета MAX_EXPENSIVE_REQUESTS запрос
+    сразу получает 503 с Retry-After, а не ждёт свободного воркера.
+    """
+    def initial(self, request, *args, **kwargs):
+        self.admission_slot = None
+        super().initial(request, *args, **kwargs)
+        if self.get_throttle_cost(request) < settings.EXPENSIVE_REQUEST_COST:
+            return
+        self.admission_slot = acquire_slot()
+        if self.admission_slot is None:
+            record_rejection("overloaded", request, self)
+            raise Overloaded(settings.ADMISSION_RETRY_AFTER)
+
+    def finalize_response(self, request, response, *args, **kwargs):
+        if getattr(self, "admission_slot", None) is not None:
+            release_slot(self.admission_slot)
+            self.admission_slot = None
+        return super().finalize_response(request, response, *args, **kwargs)
+
+    def get_throttle_cost(self, request):
+        """Стоимость запроса в единицах бюджета CostRateThrottle."""
+        return 1
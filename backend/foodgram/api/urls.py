@@ -1,8 +1,8 @@
 from django.urls import include, path
 from rest_framework.routers import DefaultRouter
 
-from .views import (IngredientsViewSet, RecipesViewSet, SubscriptionsViewSet,
-                    TagsViewSet)
+from .views import (EventsViewSet, HouseholdViewSet, IngredientsViewSet,
+                    RecipesViewSet, SubscriptionsViewSet, TagsViewSet)
 
 app_name = 'api'
 
@@ -11,6 +11,8 @@ router.register('recipes', RecipesViewSet, basename="recipes")
 router.register('ingredients', IngredientsViewSet, basename="ingredients")
 router.register('tags', TagsViewSet, basename="tags")
 router.register('users', SubscriptionsViewSet, basename="users")
+router.register('households', HouseholdViewSet, basename="households")
+router.register('events', EventsViewSet, basename="events")
 
 urlpatterns = [
     path('', include(router.urls)),
@@ -1,20 +1,35 @@
-from django.db.models import Sum
+from django.db import IntegrityError, transaction
 from django.http import HttpResponse
 from django.shortcuts import get_object_or_404
 from django_filters.rest_framework import DjangoFilterBackend
-from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                            ShoppingCart, Tag)
-from rest_framework import status, viewsets
+from events.outbox import (BATCH_SIZE, MAX_BATCH_SIZE, collect_events,
+                           read_events)
+from recipes.models import (Favorite, Household, HouseholdInvite,
+                            HouseholdMember, Ingredient, Recipe, ShoppingCart,
+                            Tag)
+from recipes.shopping_list import (BASE_UNIT, cart_list_items,
+                                   format_shopping_list, get_unit_grams,
+                                   read_shopping_list)
+from recipes.tasks import schedule_shopping_list
+from rest_framework import mixins, status, viewsets
 from rest_framework.decorators import action
-from rest_framework.permissions import IsAuthenticated
+from rest_framework.exceptions import PermissionDenied, ValidationError
+from rest_framework.permissions import IsAdminUser, IsAuthenticated
 from rest_framework.response import Response
 from users.models import Follow, User
 
+from .catalogue import read_snapshot, snapshot_response
+from .edge_cache import (INGREDIENTS, RECIPES, TAGS, EdgeCacheMixin,
+                         ingredient_key, recipe_key, recipe_keys, tag_key)
 from .filters import IngredientFilter, RecipeFilter
 from .permissions import IsAuthorOrAdminOrReadOnly
-from .serializers import (IngredientSerializer, RecipeCreateSerializer,
-                          RecipeSerializer, RecipeShortSerializer,
+from .serializers import (EventSerializer, HouseholdMemberCreateSerializer,
+                          HouseholdSerializer, IngredientSerializer,
+                          RecipeCreateSerializer, RecipeSerializer,
+                          RecipeShortSerializer, ShoppingCartSerializer,
                           SubscriptionSerializer, TagSerializer)
+from .snapshots import with_user_flags
+from .throttling import AdmissionControlMixin, CostRateThrottle
 
 
 class SubscriptionsViewSet(viewsets.GenericViewSet):
@@ -33,6 +48,7 @@ class SubscriptionsViewSet(viewsets.GenericViewSet):
     @action(detail=True,
             methods=["post", "delete"],
             permission_classes=(IsAuthenticated,))
+    @transaction.atomic
     def subscribe(self, request, pk):
         author = get_object_or_404(User, pk=pk)
         if request.method == "DELETE":
@@ -48,27 +64,85 @@ class SubscriptionsViewSet(viewsets.GenericViewSet):
                         status=status.HTTP_201_CREATED)
 
 
-class TagsViewSet(viewsets.ReadOnlyModelViewSet):
+class CatalogueSnapshotMixin:
+    """Полный список без параметров отдаётся из готового снимка каталога."""
+    catalogue_name = None
+
+    def list(self, request, *args, **kwargs):
+        if (not request.query_params
+                and request.accepted_renderer.format == "json"):
+            snapshot = read_snapshot(self.catalogue_name)
+            if snapshot is not None:
+                return snapshot_response(request, snapshot)
+        return super().list(request, *args, **kwargs)
+
+
+class TagsViewSet(EdgeCacheMixin, CatalogueSnapshotMixin,
+                  viewsets.ReadOnlyModelViewSet):
+    catalogue_name = "tags"
+    collection_key = TAGS
+    entity_key = staticmethod(tag_key)
     serializer_class = TagSerializer
     queryset = Tag.objects.all()
     pagination_class = None
 
 
-class IngredientsViewSet(viewsets.ReadOnlyModelViewSet):
+class IngredientsViewSet(EdgeCacheMixin, AdmissionControlMixin,
+                         CatalogueSnapshotMixin,
+                         viewsets.ReadOnlyModelViewSet):
+    catalogue_name = "ingredients"
+    collection_key = INGREDIENTS
+    entity_key = staticmethod(ingredient_key)
     serializer_class = IngredientSerializer
     queryset = Ingredient.objects.all()
     pagination_class = None
     filter_backends = (IngredientFilter,)
     search_fields = ("^name",)
+    throttle_classes = (CostRateThrottle,)
 
+    def get_throttle_cost(self, request):
+        # Без фильтра и без готового снимка сериализуется весь справочник.
+        if (self.action == "list" and not request.query_params.get("name")
+                and read_snapshot(self.catalogue_name) is None):
+            return 10
+        return 1
 
-class RecipesViewSet(viewsets.ModelViewSet):
+
+class RecipesViewSet(EdgeCacheMixin, AdmissionControlMixin,
+                     viewsets.ModelViewSet):
     serializer_class = RecipeSerializer
     queryset = Recipe.objects.all()
     permission_classes = (IsAuthorOrAdminOrReadOnly,)
     filter_backends = (DjangoFilterBackend,)
     filterset_fields = ("color", "birth_year")
     filterset_class = RecipeFilter
+    throttle_classes = (CostRateThrottle,)
+
+    def get_queryset(self):
+        return with_user_flags(super().get_queryset(), self.request.user)
+
+    @transaction.atomic
+    def perform_destroy(self, instance):
+        with collect_events():
+            instance.delete()
+
+    def get_surrogate_keys(self, data):
+        if self.action == "retrieve":
+            return recipe_keys([data])
+        if self.action == "similar":
+            return recipe_keys(data) | {recipe_key(self.kwargs["pk"])}
+        return recipe_keys(data["results"]) | {RECIPES}
+
+    def get_throttle_cost(self, request):
+        if self.action == "download_shopping_cart":
+            return 20
+        if self.action == "similar":
+            return 2
+        if self.action == "list":
+            # Глубокие страницы дороже: OFFSET читает все пропущенные строки.
+            page = request.query_params.get("page", "")
+            return min(1 + (int(page) // 10 if page.isdigit() else 0), 20)
+        return 1
 
     def get_serializer_class(self):
         if self.action in ["create", "partial_update"]:
@@ -78,6 +152,7 @@ class RecipesViewSet(viewsets.ModelViewSet):
     @action(detail=True,
             methods=["post", "delete"],
             permission_classes=(IsAuthenticated,))
+    @transaction.atomic
     def favorite(self, request, **kwargs):
         recipe = get_object_or_404(Recipe, id=kwargs["pk"])
         if request.method == "DELETE":
@@ -100,9 +175,10 @@ class RecipesViewSet(viewsets.ModelViewSet):
                         status=status.HTTP_400_BAD_REQUEST)
 
     @action(detail=True,
-            methods=["post", "delete"],
+            methods=["post", "patch", "delete"],
             permission_classes=(IsAuthenticated,),
             pagination_class=None)
+    @transaction.atomic
     def shopping_cart(self, request, **kwargs):
         recipe = get_object_or_404(Recipe, id=kwargs["pk"])
         if request.method == "DELETE":
@@ -112,36 +188,185 @@ class RecipesViewSet(viewsets.ModelViewSet):
                 {"detail": "Рецепт удален из списка покупок"},
                 status=status.HTTP_204_NO_CONTENT
             )
+        if request.method == "PATCH":
+            cart = ShoppingCartSerializer(
+                get_object_or_404(ShoppingCart, user=request.user,
+                                  recipe=recipe),
+                data=request.data)
+            cart.is_valid(raise_exception=True)
+            cart.save()
+            return Response(cart.data)
         serializer = RecipeShortSerializer(
             recipe,
             data=request.data,
             context={"request": request}
         )
         serializer.is_valid(raise_exception=True)
+        cart = ShoppingCartSerializer(data=request.data)
+        cart.is_valid(raise_exception=True)
         if not ShoppingCart.objects.filter(user=request.user,
                                            recipe=recipe).exists():
-            ShoppingCart.objects.create(user=request.user, recipe=recipe)
-            return Response(serializer.data,
+            cart.save(user=request.user, recipe=recipe)
+            return Response(dict(serializer.data, **cart.data),
                             status=status.HTTP_201_CREATED)
         return Response({"errors": "Рецепт уже в списке покупок"},
                         status=status.HTTP_400_BAD_REQUEST)
 
+    @action(detail=True, pagination_class=None)
+    def similar(self, request, **kwargs):
+        recipe = get_object_or_404(Recipe, id=kwargs["pk"])
+        recipes = with_user_flags(Recipe.objects.filter(
+            similar_to__recipe=recipe).order_by("-similar_to__score"),
+            request.user)
+        serializer = RecipeSerializer(recipes, many=True,
+                                      context={"request": request})
+        return Response(serializer.data)
+
     @action(detail=False, methods=["get"],
             permission_classes=(IsAuthenticated,))
     def download_shopping_cart(self, request, **kwargs):
-        ingredients = RecipeIngredient.objects.filter(
-            recipe__cart__user=request.user).values(
-            "ingredient__name", "ingredient__measurement_unit").annotate(
-            total_amount=Sum("amount"))
-        content_list = []
-        for ingredient in ingredients:
-            content_list.append(
-                f"{ingredient['ingredient__name']} "
-                f"({ingredient['ingredient__measurement_unit']}) - "
-                f"{ingredient['total_amount']}")
-        content = "Ваш список покупок:\n\n" + "\n".join(content_list)
+        unit = request.query_params.get("unit", BASE_UNIT)
+        grams = get_unit_grams(unit)
+        if grams is None:
+            return Response(
+                {"errors": "Нельзя пересчитать список в эту единицу"},
+                status=status.HTTP_400_BAD_REQUEST)
+        items = read_shopping_list(request.user, unit)
+        if not items:
+            # Список собирает задача под блокировкой, выгрузка не ждёт её.
+            items = cart_list_items(request.user, unit, grams)
+            if items:
+                schedule_shopping_list([request.user.pk], unit)
+        content = format_shopping_list(items)
         filename = "shopping_cart.txt"
         file = HttpResponse(content, content_type="text/plain")
         file["Content-Disposition"] = "attachment; filename={0}".format(
             filename)
         return file
+
+
+class HouseholdViewSet(mixins.CreateModelMixin,
+                       mixins.ListModelMixin,
+                       mixins.RetrieveModelMixin,
+                       mixins.DestroyModelMixin,
+                       viewsets.GenericViewSet):
+    """Семья пользователя: общий список покупок по корзинам участников."""
+    serializer_class = HouseholdSerializer
+    permission_classes = (IsAuthenticated,)
+    pagination_class = None
+
+    def get_queryset(self):
+        if self.action in ("invites", "join"):
+            households = Household.objects.filter(
+                invites__user=self.request.user)
+        else:
+            households = Household.objects.filter(
+                members__user=self.request.user)
+        return households.prefetch_related("members__user", "invites__user")
+
+    @transaction.atomic
+    def perform_create(self, serializer):
+        household = serializer.save(owner=self.request.user)
+        try:
+            with transaction.atomic():
+                HouseholdMember.objects.create(
+                    household=household, user=self.request.user)
+        except IntegrityError:
+            raise ValidationError({"errors": "Вы уже состоите в семье"})
+
+    def perform_destroy(self, instance):
+        if instance.owner != self.request.user:
+            raise PermissionDenied("Удалить семью может только создатель")
+        instance.delete()
+
+    @action(detail=True, methods=["post", "delete"])
+    def members(self, request, **kwargs):
+        """Приглашение (POST), исключение или отмена приглашения (DELETE)."""
+        household = self.get_object()
+        if request.method == "DELETE":
+            return self.remove_member(household, request)
+        if household.owner != request.user:
+            raise PermissionDenied(
+                "Приглашать участников может только создатель")
+        serializer = HouseholdMemberCreateSerializer(
+            data=request.data, context={"household": household})
+        serializer.is_valid(raise_exception=True)
+        HouseholdInvite.objects.get_or_create(
+            household=household, user=serializer.validated_data["user"])
+        household = self.get_queryset().get(pk=household.pk)
+        return Response(self.get_serializer(household).data,
+                        status=status.HTTP_201_CREATED)
+
+    def remove_member(self, household, request):
+        user_id = str(request.data.get("user", request.user.id))
+        if not user_id.isdigit():
+            raise ValidationError({"user": ["Укажите id пользователя"]})
+        member = (
+            HouseholdMember.objects.filter(
+                household=household, user_id=user_id).first()
+            or get_object_or_404(
+                HouseholdInvite, household=household, user_id=user_id)
+        )
+        if member.user_id == household.owner_id:
+            raise ValidationError(
+                {"errors": "Создатель не может выйти из семьи"})
+        if request.user not in (household.owner, member.user):
+            raise PermissionDenied(
+                "Удалять участников может только создатель")
+        member.delete()
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+    @action(detail=False, methods=["get"])
+    def invites(self, request):
+        """Семьи, в которые приглашён текущий пользователь."""
+        serializer = self.get_serializer(self.get_queryset(), many=True)
+        return Response(serializer.data)
+
+    @action(detail=True, methods=["post", "delete"])
+    def join(self, request, **kwargs):
+        """POST принимает приглашение, DELETE отклоняет его."""
+        household = self.get_object()
+        invite = get_object_or_404(
+            HouseholdInvite, household=household, user=request.user)
+        if request.method == "DELETE":
+            invite.delete()
+            return Response(status=status.HTTP_204_NO_CONTENT)
+        try:
+            with transaction.atomic():
+                HouseholdMember.objects.create(
+                    household=household, user=request.user)
+                invite.delete()
+        except IntegrityError:
+            raise ValidationError({"errors": "Вы уже состоите в семье"})
+        household = Household.objects.prefetch_related(
+            "members__user", "invites__user").get(pk=household.pk)
+        return Response(self.get_serializer(household).data,
+                        status=status.HTTP_201_CREATED)
+
+
+class EventsViewSet(viewsets.GenericViewSet):
+    """Журнал изменений: потребители читают его пачками по курсору.
+
+    Ответ содержит cursor, который передаётся в следующий запрос
+    параметром after, и skipped — диапазоны id, пропущенные курсором как
+    откаченные транзакции. Параметр entity (можно несколько) оставляет только
+    события этих сущностей, курсор при этом проходит и остальные.
+    """
+    serializer_class = EventSerializer
+    permission_classes = (IsAdminUser,)
+
+    def list(self, request):
+        after = request.query_params.get("after", "0")
+        limit = request.query_params.get("limit", str(BATCH_SIZE))
+        if not after.isdigit() or not limit.isdigit():
+            return Response(
+                {"errors": "after и limit должны быть целыми числами"},
+                status=status.HTTP_400_BAD_REQUEST)
+        events, cursor, skipped = read_events(
+            int(after), min(int(limit), MAX_BATCH_SIZE),
+            request.query_params.getlist("entity") or None)
+        return Response({
+            "cursor": cursor,
+            "skipped": skipped,
+            "events": self.get_serializer(events, many=True).data,
+        })
@@ -0,0 +1,21 @@
+from django.contrib import admin
+from foodgram.paginators import EstimatedCountPaginator
+
+from .models import Event, EventCursor
+
+
+class EventAdmin(admin.ModelAdmin):
+    list_display = ("pk", "created", "entity", "entity_id", "action")
+    list_filter = ("entity", "action")
+    readonly_fields = ("created", "entity", "entity_id", "action", "data")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class EventCursorAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "position", "updated")
+    search_fields = ("name",)
+
+
+admin.site.register(Event, EventAdmin)
+admin.site.register(EventCursor, EventCursorAdmin)
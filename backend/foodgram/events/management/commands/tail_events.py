@@ -0,0 +1,56 @@
+import json
+import time
+
+from django.core.management import BaseCommand
+from events.models import EventCursor
+from events.outbox import BATCH_SIZE, read_events
+
+
+class Command(BaseCommand):
+    help = ("Выводит события журнала изменений построчно в JSON. "
+            "С --consumer продолжает с сохранённого курсора и сохраняет "
+            "его после каждой пачки.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--after", type=int,
+                            help="начать после события с этим id")
+        parser.add_argument("--consumer",
+                            help="имя потребителя для хранения курсора")
+        parser.add_argument("--entity", action="append",
+                            help="только события этой сущности")
+        parser.add_argument("--batch-size", type=int, default=BATCH_SIZE)
+        parser.add_argument("--follow", action="store_true",
+                            help="ждать новые события")
+        parser.add_argument("--poll-interval", type=float, default=1.0)
+
+    def handle(self, *args, **options):
+        consumer = None
+        if options["consumer"]:
+            consumer, _ = EventCursor.objects.get_or_create(
+                name=options["consumer"])
+        cursor = options["after"]
+        if cursor is None:
+            cursor = consumer.position if consumer else 0
+        while True:
+            events, position, skipped = read_events(
+                cursor, options["batch_size"], options["entity"])
+            for first, last in skipped:
+                self.stderr.write(f"Пропущены события {first}-{last}")
+            for event in events:
+                self.stdout.write(json.dumps({
+                    "id": event.id,
+                    "created": event.created.isoformat(),
+                    "entity": event.entity,
+                    "entity_id": event.entity_id,
+                    "action": event.action,
+                    "data": json.loads(event.data),
+                }, ensure_ascii=False))
+            if position == cursor:
+                if not options["follow"]:
+                    return
+                time.sleep(options["poll_interval"])
+                continue
+            if consumer is not None:
+                consumer.position = position
+                consumer.save(update_fields=["position", "updated"])
+            cursor = position
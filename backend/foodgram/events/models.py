@@ -0,0 +1,73 @@
+from django.db import models
+
+
+class Event(models.Model):
+    """Событие об изменении данных (outbox).
+
+    Пишется в той же транзакции, что и изменение. Потребители читают
+    события по возрастанию id и запоминают курсор — id последнего
+    обработанного события.
+    """
+    CREATED = "created"
+    UPDATED = "updated"
+    DELETED = "deleted"
+    ACTIONS = (
+        (CREATED, "Создание"),
+        (UPDATED, "Изменение"),
+        (DELETED, "Удаление"),
+    )
+
+    id = models.BigAutoField(primary_key=True)
+    created = models.DateTimeField(
+        verbose_name="Время",
+        auto_now_add=True,
+    )
+    entity = models.CharField(
+        verbose_name="Сущность",
+        max_length=20,
+    )
+    entity_id = models.BigIntegerField(
+        verbose_name="id сущности",
+    )
+    action = models.CharField(
+        verbose_name="Действие",
+        max_length=10,
+        choices=ACTIONS,
+    )
+    data = models.TextField(
+        verbose_name="Данные в JSON",
+        default="{}",
+    )
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = "Событие"
+        verbose_name_plural = "События"
+
+    def __str__(self):
+        return f"{self.entity} {self.entity_id}: {self.action}"
+
+
+class EventCursor(models.Model):
+    """Позиция потребителя в журнале событий."""
+    name = models.CharField(
+        verbose_name="Потребитель",
+        max_length=200,
+        unique=True,
+    )
+    position = models.BigIntegerField(
+        verbose_name="id последнего обработанного события",
+        default=0,
+    )
+    updated = models.DateTimeField(
+        verbose_name="Обновлён",
+        auto_now=True,
+    )
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name = "Курсор потребителя"
+        verbose_name_plural = "Курсоры потребителей"
+
+    def __str__(self):
+        return f"{self.name}: {self.position}"
@@ -0,0 +1,91 @@
+import json
+import logging
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.conf import settings
+from django.utils import timezone
+
+from .models import Event
+
+BATCH_SIZE = 100
+MAX_BATCH_SIZE = 1000
+
+logger = logging.getLogger(__name__)
+
+_state = threading.local()
+
+
+def record(entity, action, entity_id, **data):
+    """Записывает событие в текущей транзакции.
+
+    Внутри collect_events() события одной сущности объединяются и
+    пишутся одним запросом в конце блока.
+    """
+    pending = getattr(_state, "pending", None)
+    if pending is None:
+        Event.objects.create(entity=entity, entity_id=entity_id,
+                             action=action, data=json.dumps(data))
+        return
+    key = (entity, entity_id)
+    if key not in pending:
+        pending[key] = (action, data)
+        return
+    first, previous = pending[key]
+    data = dict(previous, **data)
+    if action == Event.DELETED and first == Event.CREATED:
+        # Создана и удалена в одной транзакции: снаружи ничего не было.
+        del pending[key]
+    elif action == Event.DELETED or first != Event.CREATED:
+        pending[key] = (action, data)
+    else:
+        pending[key] = (first, data)
+
+
+@contextmanager
+def collect_events():
+    """Объединяет события до конца блока, блок должен быть в транзакции."""
+    if getattr(_state, "pending", None) is not None:
+        yield
+        return
+    _state.pending = {}
+    try:
+        yield
+        pending = _state.pending
+    finally:
+        _state.pending = None
+    Event.objects.bulk_create([
+        Event(entity=entity, entity_id=entity_id, action=action,
+              data=json.dumps(data))
+        for (entity, entity_id), (action, data) in pending.items()
+    ])
+
+
+def read_events(after=0, limit=BATCH_SIZE, entities=None):
+    """События после курсора after, новый курсор и пропущенные id.
+
+    id выдаются до коммита, поэтому событие с меньшим id может стать
+    видно позже большего. На пропуске в id чтение останавливается, пока
+    следующее событие не старше EVENTS_COMMIT_LAG секунд: затем пропуск
+    считается откатом транзакции. Если это была долгая транзакция, её
+    события потребитель уже не получит, поэтому пропущенные диапазоны id
+    возвращаются списком пар [первый, последний] и пишутся в лог.
+    """
+    horizon = timezone.now() - timedelta(seconds=settings.EVENTS_COMMIT_LAG)
+    cursor = after
+    events = []
+    skipped = []
+    for event in Event.objects.filter(id__gt=after).order_by("id")[:limit]:
+        # Новый потребитель (курсор 0) начинает с первого видимого события.
+        if cursor and event.id != cursor + 1:
+            if event.created > horizon:
+                break
+            skipped.append([cursor + 1, event.id - 1])
+            logger.warning("Пропущены события %s-%s: транзакция не "
+                           "закоммичена за %s с", cursor + 1, event.id - 1,
+                           settings.EVENTS_COMMIT_LAG)
+        cursor = event.id
+        if entities is None or event.entity in entities:
+            events.append(event)
+    return events, cursor, skipped
@@ -0,0 +1,96 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save
+from django.dispatch import receiver
+from recipes.models import (Favorite, Ingredient, Recipe, RecipeIngredient,
+                            ShoppingCart, Tag)
+from users.models import Follow
+
+from .models import Event
+from .outbox import record
+
+
+def saved(created):
+    return Event.CREATED if created else Event.UPDATED
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    record("recipe", saved(created), instance.pk, author=instance.author_id)
+
+
+@receiver(post_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    record("recipe", Event.DELETED, instance.pk, author=instance.author_id)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ("post_add", "post_remove", "post_clear"):
+        return
+    if not reverse:
+        record("recipe", Event.UPDATED, instance.pk,
+               author=instance.author_id)
+    elif pk_set:
+        for recipe_id, author_id in Recipe.objects.filter(
+                pk__in=pk_set).values_list("pk", "author_id"):
+            record("recipe", Event.UPDATED, recipe_id, author=author_id)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    record("recipe", Event.UPDATED, instance.recipe_id)
+
+
+@receiver(post_save, sender=Tag)
+def tag_saved(sender, instance, created, **kwargs):
+    record("tag", saved(created), instance.pk)
+
+
+@receiver(post_delete, sender=Tag)
+def tag_deleted(sender, instance, **kwargs):
+    record("tag", Event.DELETED, instance.pk)
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, **kwargs):
+    record("ingredient", saved(created), instance.pk)
+
+
+@receiver(post_delete, sender=Ingredient)
+def ingredient_deleted(sender, instance, **kwargs):
+    record("ingredient", Event.DELETED, instance.pk)
+
+
+@receiver(post_save, sender=Favorite)
+def favorite_saved(sender, instance, created, **kwargs):
+    record("favorite", saved(created), instance.pk,
+           user=instance.user_id, recipe=instance.recipe_id)
+
+
+@receiver(post_delete, sender=Favorite)
+def favorite_deleted(sender, instance, **kwargs):
+    record("favorite", Event.DELETED, instance.pk,
+           user=instance.user_id, recipe=instance.recipe_id)
+
+
+@receiver(post_save, sender=ShoppingCart)
+def cart_saved(sender, instance, created, **kwargs):
+    record("cart", saved(created), instance.pk, user=instance.user_id,
+           recipe=instance.recipe_id, servings=instance.servings)
+
+
+@receiver(post_delete, sender=ShoppingCart)
+def cart_deleted(sender, instance, **kwargs):
+    record("cart", Event.DELETED, instance.pk, user=instance.user_id,
+           recipe=instance.recipe_id, servings=instance.servings)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    record("follow", saved(created), instance.pk,
+           user=instance.user_id, author=instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    record("follow", Event.DELETED, instance.pk,
+           user=instance.user_id, author=instance.author_id)
@@ -0,0 +1,49 @@
+import random
+import time
+
+from django.conf import settings
+
+from .routers import use_replica
+
+SAFE_METHODS = ("GET", "HEAD", "OPTIONS")
+PRIMARY_COOKIE = "db_primary_until"
+
+
+class ReplicaRoutingMiddleware:
+    """Выбирает базу для чтения на время запроса.
+
+    Безопасный запрос целиком читает с одной случайно выбранной реплики.
+    После успешной записи клиент получает cookie, и ещё
+    REPLICA_STICKY_SECONDS его чтения идут в основную базу, чтобы он видел
+    свои изменения.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        if (settings.READ_REPLICAS and request.method in SAFE_METHODS
+                and not self.is_sticky(request)):
+            use_replica(random.choice(settings.READ_REPLICAS))
+        try:
+            response = self.get_response(request)
+        finally:
+            use_replica(None)
+        if (request.method not in SAFE_METHODS
+                and response.status_code < 400
+                and settings.READ_REPLICAS):
+            response.set_cookie(
+                PRIMARY_COOKIE,
+                str(int(time.time() + settings.REPLICA_STICKY_SECONDS)),
+                max_age=settings.REPLICA_STICKY_SECONDS,
+                httponly=True,
+                samesite="Lax",
+            )
+        return response
+
+    @staticmethod
+    def is_sticky(request):
+        try:
+            return float(request.COOKIES.get(PRIMARY_COOKIE, 0)) > time.time()
+        except ValueError:
+            return False
@@ -0,0 +1,36 @@
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор, который не считает строки больших таблиц целиком.
+
+    Для запроса без фильтров в PostgreSQL число строк берётся из
+    статистики планировщика (pg_class.reltuples). Малые таблицы, таблицы
+    без статистики, фильтрованные запросы и другие СУБД считаются точно.
+    """
+    exact_count_limit = 10000
+
+    @cached_property
+    def count(self):
+        estimate = self.estimate()
+        if estimate is not None and estimate >= self.exact_count_limit:
+            return estimate
+        return super().count
+
+    def estimate(self):
+        queryset = self.object_list
+        query = getattr(queryset, "query", None)
+        if query is None or query.where or query.distinct:
+            return None
+        connection = connections[queryset.db]
+        if connection.vendor != "postgresql":
+            return None
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class "
+                "WHERE oid = to_regclass(%s)",
+                [queryset.model._meta.db_table])
+            row = cursor.fetchone()
+        return row[0] if row and row[0] > 0 else None
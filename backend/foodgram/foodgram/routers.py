@@ -0,0 +1,33 @@
+import threading
+
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_state = threading.local()
+
+
+def use_replica(alias):
+    """Задаёт реплику для чтения в текущем потоке, None — основная база."""
+    _state.replica = alias
+
+
+class ReplicaRouter:
+    """Чтение с реплик для безопасных запросов, запись всегда в основную БД.
+
+    Реплику выбирает middleware одну на запрос: у реплик разное отставание,
+    и чтения одного запроса с разных реплик дали бы несогласованный ответ.
+    Вне запросов, внутри транзакций и в запросах на запись чтение тоже
+    идёт в основную базу, чтобы не видеть отставание реплик.
+    """
+
+    def db_for_read(self, model, **hints):
+        replica = getattr(_state, "replica", None)
+        if (replica is None
+                or connections[DEFAULT_DB_ALIAS].in_atomic_block):
+            return DEFAULT_DB_ALIAS
+        return replica
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
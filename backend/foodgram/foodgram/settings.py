@@ -16,8 +16,10 @@ DEBUG = os.environ.get("DEBUG") == "True"
 ALLOWED_HOSTS = os.environ.get("ALLOWED_HOSTS", "*").split(",")
 
 INSTALLED_APPS = [
-    'api',
-    'recipes',
+    'api.apps.ApiConfig',
+    'recipes.apps.RecipesConfig',
+    'tasks.apps.TasksConfig',
+    'events.apps.EventsConfig',
     'users',
     'django.contrib.admin',
     'django.contrib.auth',
@@ -33,6 +35,8 @@ INSTALLED_APPS = [
 
 MIDDLEWARE = [
     'django.middleware.security.SecurityMiddleware',
+    'django.middleware.gzip.GZipMiddleware',
+    'foodgram.middleware.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -82,6 +86,61 @@ DATABASES = {
     }
 }
 
+# Реплики для чтения: хосты через запятую (host[:port]), для SQLite — пути
+# к файлам баз.
+READ_REPLICAS = []
+for number, replica in enumerate(
+        filter(None, os.getenv("DB_REPLICAS", "").split(","))):
+    alias = f"replica_{number}"
+    DATABASES[alias] = dict(DATABASES["default"], TEST={"MIRROR": "default"})
+    if DATABASES[alias]["ENGINE"].endswith("sqlite3"):
+        DATABASES[alias]["NAME"] = replica
+    else:
+        host, _, port = replica.partition(":")
+        DATABASES[alias]["HOST"] = host
+        DATABASES[alias]["PORT"] = port or DATABASES["default"]["PORT"]
+    READ_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ["foodgram.routers.ReplicaRouter"]
+
+REPLICA_STICKY_SECONDS = int(os.getenv("REPLICA_STICKY_SECONDS", "10"))
+
+# Дорогие запросы (стоимостью от EXPENSIVE_REQUEST_COST) одновременно
+# выполняются не более чем в MAX_EXPENSIVE_REQUESTS воркерах, остальные
+# получают 503 с Retry-After через ADMISSION_RETRY_AFTER секунд.
+EXPENSIVE_REQUEST_COST = 10
+MAX_EXPENSIVE_REQUESTS = int(os.getenv("MAX_EXPENSIVE_REQUESTS", "2"))
+ADMISSION_RETRY_AFTER = 5
+# Слот выполняющегося запроса освобождается сам через ADMISSION_TIMEOUT
+# секунд, если воркер упал, не освободив его.
+ADMISSION_TIMEOUT = 300
+
+# Фоновые задачи (manage.py run_worker): повтор через TASKS_RETRY_BACKOFF
+# секунд с удвоением до TASKS_MAX_BACKOFF. Пока задача выполняется, воркер
+# раз в TASKS_HEARTBEAT секунд продлевает её блокировку на TASKS_TIMEOUT
+# секунд; задача, которую никто не продлил, выполняется заново.
+TASKS_PROCESSES = int(os.getenv("TASKS_PROCESSES", "2"))
+TASKS_TIMEOUT = 600
+TASKS_HEARTBEAT = 60
+TASKS_RETRY_BACKOFF = 10
+TASKS_MAX_BACKOFF = 3600
+TASKS_KEEP_DAYS = 7
+
+# Анонимные GET-ответы API кэширует nginx (или CDN) на EDGE_CACHE_TTL
+# секунд. Ключи изменённых рецептов, авторов и тегов отправляются на
+# EDGE_CACHE_PURGE_URL; без него кэш устаревает только по времени.
+EDGE_CACHE_TTL = int(os.getenv("EDGE_CACHE_TTL", "60"))
+EDGE_CACHE_PURGE_URL = os.getenv("EDGE_CACHE_PURGE_URL", "")
+EDGE_CACHE_PURGE_TOKEN = os.getenv("EDGE_CACHE_PURGE_TOKEN", "")
+
+# Журнал событий: пропуск в id младше EVENTS_COMMIT_LAG секунд считается
+# ещё не закоммиченной транзакцией, и чтение на нём останавливается. Когда
+# следующее видимое событие старше EVENTS_COMMIT_LAG, пропуск считается
+# откатом и курсор уходит дальше: событие транзакции, открытой дольше
+# этого срока, потребители не получат никогда. Такие id пишутся в лог
+# events.outbox и возвращаются потребителю в skipped.
+EVENTS_COMMIT_LAG = 10
+
 AUTH_PASSWORD_VALIDATORS = [
     {
         'NAME':
@@ -112,12 +171,22 @@ USE_TZ = True
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 REST_FRAMEWORK = {
+    'DEFAULT_RENDERER_CLASSES': [
+        'api.renderers.ORJSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ],
     'DEFAULT_PERMISSION_CLASSES': [
         'rest_framework.permissions.IsAuthenticatedOrReadOnly',
     ],
     'DEFAULT_AUTHENTICATION_CLASSES': [
         'rest_framework.authentication.TokenAuthentication',
     ],
+    'DEFAULT_THROTTLE_RATES': {
+        'expensive': os.getenv("EXPENSIVE_THROTTLE_RATE", "120/min"),
+    },
+    # Адрес клиента для ограничения запросов — последний в
+    # X-Forwarded-For, его добавляет nginx.
+    'NUM_PROXIES': 1,
     "DEFAULT_PAGINATION_CLASS":
     "rest_framework.pagination.PageNumberPagination",
     'PAGE_SIZE': 6,
@@ -147,3 +216,5 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'static')
 MEDIA_URL = '/media/'
 
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+CATALOGUE_ROOT = os.path.join(BASE_DIR, 'catalogue')
@@ -0,0 +1,24 @@
+import os
+
+bind = "0:8000"
+workers = int(os.environ.get("GUNICORN_WORKERS", 1))
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", 0))
+max_requests_jitter = max_requests // 10
+
+# Приложение загружается в мастере один раз, воркеры получают его
+# готовым при fork и стартуют без импорта Django.
+preload_app = True
+
+
+def when_ready(server):
+    # URLconf Django грузит при первом запросе, а с ним views,
+    # сериализаторы и фильтры. Загружаем его в мастере до fork.
+    if server.cfg.preload_app:
+        from django.urls import get_resolver
+        get_resolver().url_patterns
+
+
+def post_fork(server, worker):
+    # Соединения с базой не должны переходить из мастера в воркеры.
+    from django.db import connections
+    connections.close_all()
@@ -1,24 +1,82 @@
 from django.contrib import admin
+from django.db.models import Count, IntegerField, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from foodgram.paginators import EstimatedCountPaginator
 
-from .models import (Favorite, Ingredient, Recipe, RecipeIngredient,
-                     ShoppingCart, Tag)
+from .models import (Favorite, Household, HouseholdInvite, HouseholdMember,
+                     Ingredient, IngredientCategory, IngredientUnitMass,
+                     MeasurementUnit, Recipe, RecipeIngredient, ShoppingCart,
+                     Tag)
 
 
 class RecipeIngredientInline(admin.TabularInline):
     model = RecipeIngredient
     fields = ("ingredient", "amount")
+    autocomplete_fields = ("ingredient",)
+
+
+def count_by_recipe(model):
+    """Число строк model у рецепта коррелированным подзапросом."""
+    return Coalesce(Subquery(
+        model.objects.filter(recipe=OuterRef("pk")).order_by().values(
+            "recipe").annotate(count=Count("pk")).values("count"),
+        output_field=IntegerField(),
+    ), 0)
 
 
 class RecipeAdmin(admin.ModelAdmin):
     list_display = ("pk",
                     "name",
                     "author",
+                    "calories_per_serving",
+                    "price_per_serving",
+                    "favorites_count",
+                    "in_carts_count",
                     )
-    search_fields = ("name", "author", "author__first_name", "author__email")
+    list_select_related = ("author",)
+    search_fields = ("name", "author__username", "author__first_name",
+                     "author__email")
     list_filter = ("tags",)
+    autocomplete_fields = ("author",)
     empty_value_display = "-пусто-"
     inlines = (RecipeIngredientInline,)
 
+    def get_queryset(self, request):
+        return super().get_queryset(request).annotate(
+            favorites_count=count_by_recipe(Favorite),
+            in_carts_count=count_by_recipe(ShoppingCart),
+        )
+
+    def favorites_count(self, obj):
+        return obj.favorites_count
+    favorites_count.short_description = "В избранном"
+    favorites_count.admin_order_field = "favorites_count"
+
+    def in_carts_count(self, obj):
+        return obj.in_carts_count
+    in_carts_count.short_description = "В корзинах"
+    in_carts_count.admin_order_field = "in_carts_count"
+
+
+class MeasurementUnitAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "grams")
+    list_editable = ("grams",)
+    search_fields = ("name",)
+
+
+class IngredientUnitMassAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "unit", "grams")
+    list_editable = ("grams",)
+    list_select_related = ("unit",)
+    search_fields = ("name",)
+    autocomplete_fields = ("unit",)
+
+
+class IngredientCategoryAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "position")
+    list_editable = ("position",)
+    search_fields = ("name",)
+
 
 class TagAdmin(admin.ModelAdmin):
     list_display = ("pk", "name", "slug")
@@ -30,26 +88,67 @@ class IngredientAdmin(admin.ModelAdmin):
         "pk",
         "name",
         "measurement_unit",
+        "category",
     )
     list_editable = ("name", "measurement_unit",)
+    list_select_related = ("category",)
+    list_filter = ("category",)
     search_fields = ("name",)
+    autocomplete_fields = ("category",)
 
 
 class RecipeIngredientAdmin(admin.ModelAdmin):
     list_display = ("pk", "recipe", "ingredient", "amount")
     list_editable = ("ingredient", "amount")
-    search_fields = ("ingredient",)
+    list_select_related = ("recipe", "ingredient")
+    search_fields = ("ingredient__name", "recipe__name")
+    autocomplete_fields = ("ingredient",)
+    raw_id_fields = ("recipe",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
 
 
 class FavoriteAndCartAdmin(admin.ModelAdmin):
     list_display = ("pk", "user", "recipe")
     list_editable = ("user", "recipe",)
-    list_filter = ("user",)
+    list_select_related = ("user", "recipe")
+    search_fields = ("user__username", "user__email", "recipe__name")
+    autocomplete_fields = ("user", "recipe")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+class ShoppingCartAdmin(FavoriteAndCartAdmin):
+    list_display = ("pk", "user", "recipe", "servings")
+    list_editable = ("user", "recipe", "servings")
+
+
+class HouseholdMemberInline(admin.TabularInline):
+    model = HouseholdMember
+    autocomplete_fields = ("user",)
+
+
+class HouseholdInviteInline(admin.TabularInline):
+    model = HouseholdInvite
+    autocomplete_fields = ("user",)
+    readonly_fields = ("created",)
+
+
+class HouseholdAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "owner")
+    list_select_related = ("owner",)
+    search_fields = ("name", "owner__username")
+    autocomplete_fields = ("owner",)
+    inlines = (HouseholdMemberInline, HouseholdInviteInline)
 
 
 admin.site.register(Recipe, RecipeAdmin)
 admin.site.register(Tag, TagAdmin)
 admin.site.register(Ingredient, IngredientAdmin)
+admin.site.register(IngredientCategory, IngredientCategoryAdmin)
+admin.site.register(MeasurementUnit, MeasurementUnitAdmin)
+admin.site.register(IngredientUnitMass, IngredientUnitMassAdmin)
 admin.site.register(RecipeIngredient, RecipeIngredientAdmin)
 admin.site.register(Favorite, FavoriteAndCartAdmin)
-admin.site.register(ShoppingCart, FavoriteAndCartAdmin)
+admin.site.register(ShoppingCart, ShoppingCartAdmin)
+admin.site.register(Household, HouseholdAdmin)
@@ -0,0 +1,107 @@
+import time
+
+import numpy as np
+from django.core.management import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Max
+from recipes.models import Recipe, SimilarRecipe
+from recipes.similarity import BATCH_SIZE, TOP_K, build_matrix, top_k
+from users.models import User
+
+
+class Command(BaseCommand):
+    help = ("Замеряет сборку индекса похожих рецептов на синтетических "
+            "данных и время выборки соседей из таблицы с этим индексом. "
+            "Синтетические рецепты пишутся в транзакции, которая затем "
+            "откатывается.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--recipes", type=int, default=100000)
+        parser.add_argument("--ingredients", type=int, default=2200)
+        parser.add_argument("--tags", type=int, default=10)
+        parser.add_argument("--per-recipe", type=int, default=9)
+        parser.add_argument("--queries", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        count = options["recipes"]
+        per_recipe = options["per_recipe"]
+        rng = np.random.default_rng(0)
+        with transaction.atomic():
+            first_id = (Recipe.objects.aggregate(last=Max("id"))["last"]
+                        or 0) + 1
+            recipe_ids = np.arange(first_id, first_id + count,
+                                   dtype=np.int64)
+            # Популярность ингредиентов распределена по Ципфу, как в жизни.
+            popularity = 1 / np.arange(1, options["ingredients"] + 1)
+            ingredient_pairs = np.column_stack((
+                np.repeat(recipe_ids, per_recipe),
+                rng.choice(options["ingredients"], count * per_recipe,
+                           p=popularity / popularity.sum()),
+            ))
+            tag_pairs = np.column_stack((
+                np.repeat(recipe_ids, 2),
+                rng.integers(options["tags"], size=count * 2),
+            ))
+
+            started = time.perf_counter()
+            matrix = build_matrix(recipe_ids, ingredient_pairs, tag_pairs)
+            matrix_time = time.perf_counter() - started
+            started = time.perf_counter()
+            neighbours = [
+                top_k(matrix, np.arange(start, min(start + BATCH_SIZE,
+                                                   count)))
+                for start in range(0, count, BATCH_SIZE)
+            ]
+            top_k_time = time.perf_counter() - started
+            total = sum(len(cols) for batch in neighbours
+                        for cols, _ in batch)
+            self.stdout.write(
+                f"{count} рецептов, {matrix.nnz} ненулевых признаков\n"
+                f"матрица: {matrix_time:.2f} с\n"
+                f"top-{TOP_K}: {top_k_time:.2f} с, "
+                f"{total / count:.1f} соседей на рецепт")
+
+            started = time.perf_counter()
+            self.load_index(recipe_ids, neighbours)
+            self.stdout.write(
+                f"запись индекса: {time.perf_counter() - started:.2f} с")
+
+            queries = rng.choice(recipe_ids, min(options["queries"], count),
+                                 replace=False).tolist()
+            started = time.perf_counter()
+            for recipe_id in queries:
+                list(Recipe.objects.filter(
+                    similar_to__recipe_id=recipe_id,
+                ).order_by("-similar_to__score").values_list(
+                    "id", flat=True))
+            query_time = (time.perf_counter() - started) / len(queries)
+            self.stdout.write(
+                f"выборка соседей из базы: {query_time * 1000:.2f} мс "
+                f"(среднее по {len(queries)} рецептам из "
+                f"{Recipe.objects.count()})")
+            transaction.set_rollback(True)
+
+    def load_index(self, recipe_ids, neighbours):
+        """Пишет синтетические рецепты и их соседей в текущую транзакцию."""
+        author = User.objects.create(
+            username="benchmark_similarity",
+            email="benchmark_similarity@example.com")
+        Recipe.objects.bulk_create((
+            Recipe(id=recipe_id, author=author, name=f"Рецепт {recipe_id}",
+                   text="", cooking_time=1, image="upload/benchmark.png",
+                   nutrition_outdated=False, similar_outdated=False)
+            for recipe_id in recipe_ids.tolist()
+        ), batch_size=500)
+        rows = iter(recipe_ids.tolist())
+        for batch in neighbours:
+            SimilarRecipe.objects.bulk_create([
+                SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                              score=round(score, 6))
+                for recipe_id, (cols, values) in zip(rows, batch)
+                for similar_id, score in zip(recipe_ids[cols].tolist(),
+                                             values.tolist())
+            ], batch_size=500)
+        # Планировщик должен видеть настоящий размер таблиц.
+        with connection.cursor() as cursor:
+            for model in (Recipe, SimilarRecipe):
+                cursor.execute(f"ANALYZE {model._meta.db_table}")
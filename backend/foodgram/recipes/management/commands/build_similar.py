@@ -0,0 +1,16 @@
+from django.core.management import BaseCommand
+from recipes.similarity import TOP_K, update_similar
+
+
+class Command(BaseCommand):
+    help = ("Пересобирает индекс похожих рецептов для рецептов, изменённых "
+            "с прошлой сборки.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Пересобрать индекс целиком.")
+        parser.add_argument("--top", type=int, default=TOP_K)
+
+    def handle(self, *args, **options):
+        updated = update_similar(full=options["all"], k=options["top"])
+        self.stdout.write(f"Пересчитано рецептов: {updated}")
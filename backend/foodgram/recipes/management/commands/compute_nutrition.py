@@ -0,0 +1,17 @@
+from django.core.management import BaseCommand
+from recipes.nutrition import update_nutrition
+
+
+class Command(BaseCommand):
+    help = ("Пересчитывает калорийность и стоимость рецептов, у которых "
+            "изменились ингредиенты.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--all", action="store_true",
+                            help="Пересчитать все рецепты.")
+        parser.add_argument("--batch-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        updated = update_nutrition(full=options["all"],
+                                   batch_size=options["batch_size"])
+        self.stdout.write(f"Пересчитано рецептов: {updated}")
@@ -0,0 +1,71 @@
+import csv
+from itertools import islice
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import Ingredient, IngredientCategory
+from recipes.shopping_list import invalidate_shopping_lists
+
+
+class Command(BaseCommand):
+    help = ("Загружает отделы магазина из data/categories.csv (порядок "
+            "строк задаёт порядок обхода) и категории ингредиентов из "
+            "data/ingredient_categories.csv: name,category.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        categories = self.import_categories()
+        filename = f"{settings.BASE_DIR}/data/ingredient_categories.csv"
+        updated = 0
+        with open(filename, "r", encoding="utf-8") as f:
+            reader = csv.DictReader(f, fieldnames=("name", "category"))
+            while True:
+                chunk = list(islice(reader, options["chunk_size"]))
+                if not chunk:
+                    break
+                updated += self.import_chunk(chunk, categories)
+        invalidate_shopping_lists()
+        self.stdout.write(f"Категорий: {len(categories)}, "
+                          f"обновлено ингредиентов: {updated}")
+
+    def import_categories(self):
+        filename = f"{settings.BASE_DIR}/data/categories.csv"
+        with open(filename, "r", encoding="utf-8") as f:
+            names = [line.strip() for line in f if line.strip()]
+        existing = IngredientCategory.objects.in_bulk(
+            names, field_name="name")
+        categories_to_create = []
+        categories_to_update = []
+        for position, name in enumerate(names):
+            category = existing.get(name)
+            if category is None:
+                categories_to_create.append(
+                    IngredientCategory(name=name, position=position))
+            elif category.position != position:
+                category.position = position
+                categories_to_update.append(category)
+        IngredientCategory.objects.bulk_create(categories_to_create)
+        IngredientCategory.objects.bulk_update(
+            categories_to_update, ["position"])
+        return dict(IngredientCategory.objects.filter(
+            name__in=names).values_list("name", "id"))
+
+    @transaction.atomic
+    def import_chunk(self, chunk, categories):
+        rows = {row["name"]: row["category"] for row in chunk}
+        unknown = set(rows.values()) - set(categories)
+        if unknown:
+            raise CommandError(
+                f"Неизвестные категории: {', '.join(sorted(unknown))}")
+        ingredients_to_update = []
+        for ingredient in Ingredient.objects.filter(name__in=list(rows)):
+            category_id = categories[rows[ingredient.name]]
+            if ingredient.category_id != category_id:
+                ingredient.category_id = category_id
+                ingredients_to_update.append(ingredient)
+        Ingredient.objects.bulk_update(
+            ingredients_to_update, ["category"], batch_size=500)
+        return len(ingredients_to_update)
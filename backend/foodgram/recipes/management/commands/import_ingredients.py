@@ -1,7 +1,7 @@
 import csv
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, call_command
 from recipes.models import Ingredient
 
 
@@ -19,3 +19,5 @@ class Command(BaseCommand):
                 ingredients_to_create.append(ingredient)
 
         Ingredient.objects.bulk_create(ingredients_to_create)
+        call_command("import_categories")
+        call_command("build_catalogue", "ingredients")
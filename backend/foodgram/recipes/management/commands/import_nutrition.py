@@ -0,0 +1,64 @@
+import csv
+from itertools import islice
+
+from django.conf import settings
+from django.core.management import BaseCommand, CommandError
+from django.db import transaction
+from recipes.models import Ingredient
+from recipes.nutrition import NUTRIENTS, mark_outdated
+from recipes.tasks import schedule_recompute
+
+
+class Command(BaseCommand):
+    help = ("Загружает пищевую ценность и цену ингредиентов на 100 г "
+            "из CSV: name,measurement_unit,calories,proteins,fats,"
+            "carbohydrates,price.")
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--file", default=f"{settings.BASE_DIR}/data/nutrition.csv")
+        parser.add_argument("--chunk-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        try:
+            f = open(options["file"], "r", encoding="utf-8")
+        except FileNotFoundError:
+            raise CommandError(f"Файл {options['file']} не найден.")
+        updated = missing = 0
+        with f:
+            reader = csv.DictReader(
+                f, fieldnames=("name", "measurement_unit") + NUTRIENTS)
+            while True:
+                chunk = list(islice(reader, options["chunk_size"]))
+                if not chunk:
+                    break
+                chunk_updated = self.import_chunk(chunk)
+                updated += chunk_updated
+                missing += len(chunk) - chunk_updated
+        # bulk_update не вызывает сигналы: пересчёт ставится явно.
+        schedule_recompute(similar=False)
+        self.stdout.write(
+            f"Обновлено ингредиентов: {updated}, не найдено: {missing}")
+
+    @staticmethod
+    def parse(value):
+        value = (value or "").strip().replace(",", ".")
+        return float(value) if value else None
+
+    @transaction.atomic
+    def import_chunk(self, chunk):
+        rows = {(row["name"], row["measurement_unit"]): row for row in chunk}
+        ingredients = Ingredient.objects.filter(
+            name__in={name for name, _ in rows})
+        ingredients_to_update = []
+        for ingredient in ingredients:
+            row = rows.get((ingredient.name, ingredient.measurement_unit))
+            if row is None:
+                continue
+            for nutrient in NUTRIENTS:
+                setattr(ingredient, nutrient, self.parse(row[nutrient]))
+            ingredients_to_update.append(ingredient)
+        Ingredient.objects.bulk_update(ingredients_to_update, NUTRIENTS)
+        mark_outdated(ingredient_ids=[
+            ingredient.id for ingredient in ingredients_to_update])
+        return len(ingredients_to_update)
@@ -1,7 +1,7 @@
 import csv
 
 from django.conf import settings
-from django.core.management import BaseCommand
+from django.core.management import BaseCommand, call_command
 from recipes.models import Tag
 
 
@@ -20,3 +20,4 @@ class Command(BaseCommand):
                 tags_to_create.append(tags)
 
         Tag.objects.bulk_create(tags_to_create)
+        call_command("build_catalogue", "tags")
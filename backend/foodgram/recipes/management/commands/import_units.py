@@ -0,0 +1,49 @@
+import csv
+
+from django.conf import settings
+from django.core.management import BaseCommand
+from django.db import transaction
+from recipes.models import IngredientUnitMass, MeasurementUnit
+from recipes.nutrition import mark_outdated
+from recipes.shopping_list import invalidate_shopping_lists
+from recipes.tasks import schedule_recompute
+
+
+class Command(BaseCommand):
+    @transaction.atomic
+    def handle(self, *args, **options):
+        filename = f"{settings.BASE_DIR}/data/units.csv"
+        units = {}
+        with open(filename, "r", encoding="utf-8") as f:
+            reader = csv.DictReader(f, fieldnames=("name", "grams"))
+            for data in reader:
+                units[data["name"]] = (
+                    float(data["grams"]) if data["grams"] else None)
+
+        existing = MeasurementUnit.objects.in_bulk(
+            list(units), field_name="name")
+        units_to_create = []
+        units_to_update = []
+        for name, grams in units.items():
+            unit = existing.get(name)
+            if unit is None:
+                units_to_create.append(MeasurementUnit(name=name, grams=grams))
+            elif unit.grams != grams:
+                unit.grams = grams
+                units_to_update.append(unit)
+        MeasurementUnit.objects.bulk_create(units_to_create)
+        MeasurementUnit.objects.bulk_update(units_to_update, ["grams"])
+        self.import_ingredient_masses()
+        # bulk_create и bulk_update не вызывают сигналы.
+        mark_outdated(units=list(units))
+        schedule_recompute(similar=False)
+        invalidate_shopping_lists()
+
+    def import_ingredient_masses(self):
+        filename = f"{settings.BASE_DIR}/data/unit_masses.csv"
+        with open(filename, "r", encoding="utf-8") as f:
+            reader = csv.DictReader(f, fieldnames=("name", "unit", "grams"))
+            for data in reader:
+                IngredientUnitMass.objects.update_or_create(
+                    name=data["name"], unit_id=data["unit"],
+                    defaults={"grams": float(data["grams"])})
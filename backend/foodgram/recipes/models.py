@@ -28,6 +28,88 @@ class Tag(models.Model):
         return self.name
 
 
+class MeasurementUnit(models.Model):
+    """Единица измерения и её масса в граммах, базовой единице пересчёта.
+
+    Для объёмных единиц указана масса воды, для штучных масса не задана.
+    """
+    name = models.CharField(
+        verbose_name="Единица измерения",
+        max_length=200,
+        unique=True,
+    )
+    grams = models.FloatField(
+        verbose_name="Масса единицы, г",
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name = "Единица измерения"
+        verbose_name_plural = "Единицы измерения"
+
+    def __str__(self):
+        return self.name
+
+
+class IngredientUnitMass(models.Model):
+    """Масса единицы измерения для конкретного продукта.
+
+    Переопределяет MeasurementUnit.grams: учитывает плотность (ложка
+    сахара тяжелее ложки воды) и массу штучных единиц.
+    """
+    name = models.CharField(
+        verbose_name="Название ингредиента",
+        max_length=200,
+    )
+    unit = models.ForeignKey(
+        MeasurementUnit,
+        verbose_name="Единица измерения",
+        to_field="name",
+        on_delete=models.CASCADE,
+        related_name="ingredient_masses",
+    )
+    grams = models.FloatField(
+        verbose_name="Масса единицы, г",
+    )
+
+    class Meta:
+        ordering = ["name"]
+        verbose_name = "Масса единицы ингредиента"
+        verbose_name_plural = "Массы единиц ингредиентов"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["name", "unit"],
+                name="unique_ingredient_unit_mass"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.name}, {self.unit}: {self.grams} г"
+
+
+class IngredientCategory(models.Model):
+    """Отдел магазина. position задаёт порядок обхода отделов."""
+    name = models.CharField(
+        verbose_name="Название категории",
+        max_length=200,
+        unique=True,
+    )
+    position = models.PositiveSmallIntegerField(
+        verbose_name="Порядок в списке покупок",
+        default=0,
+    )
+
+    class Meta:
+        ordering = ["position", "name"]
+        verbose_name = "Категория ингредиентов"
+        verbose_name_plural = "Категории ингредиентов"
+
+    def __str__(self):
+        return self.name
+
+
 class Ingredient(models.Model):
     name = models.CharField(
         verbose_name="Название ингредиента",
@@ -37,6 +119,39 @@ class Ingredient(models.Model):
         verbose_name="Единица измерения",
         max_length=200,
     )
+    category = models.ForeignKey(
+        IngredientCategory,
+        verbose_name="Категория",
+        on_delete=models.SET_NULL,
+        related_name="ingredients",
+        null=True,
+        blank=True,
+    )
+    calories = models.FloatField(
+        verbose_name="Калорийность на 100 г, ккал",
+        null=True,
+        blank=True,
+    )
+    proteins = models.FloatField(
+        verbose_name="Белки на 100 г, г",
+        null=True,
+        blank=True,
+    )
+    fats = models.FloatField(
+        verbose_name="Жиры на 100 г, г",
+        null=True,
+        blank=True,
+    )
+    carbohydrates = models.FloatField(
+        verbose_name="Углеводы на 100 г, г",
+        null=True,
+        blank=True,
+    )
+    price = models.FloatField(
+        verbose_name="Цена за 100 г, руб.",
+        null=True,
+        blank=True,
+    )
 
     class Meta:
         ordering = ["name"]
@@ -53,6 +168,22 @@ class Ingredient(models.Model):
         return f"{self.name}, {self.measurement_unit}"
 
 
+class RecipeQuerySet(models.QuerySet):
+
+    def mark_outdated(self, nutrition=True, similar=True):
+        """Помечает рецепты к пересчёту и увеличивает data_version.
+
+        Пересчёт снимает флаг только у рецептов, чья версия не изменилась
+        с момента чтения данных.
+        """
+        fields = {"data_version": models.F("data_version") + 1}
+        if nutrition:
+            fields["nutrition_outdated"] = True
+        if similar:
+            fields["similar_outdated"] = True
+        return self.update(**fields)
+
+
 class Recipe(models.Model):
     author = models.ForeignKey(
         User,
@@ -96,6 +227,70 @@ class Recipe(models.Model):
         verbose_name="Дата создания",
         auto_now_add=True,
     )
+    servings = models.PositiveSmallIntegerField(
+        verbose_name="Количество порций",
+        default=1,
+        validators=[
+            MinValueValidator(1, "Количество порций не может быть меньше 1"),
+        ],
+    )
+    total_calories = models.FloatField(
+        verbose_name="Калорийность, ккал",
+        null=True,
+        blank=True,
+    )
+    total_proteins = models.FloatField(
+        verbose_name="Белки, г",
+        null=True,
+        blank=True,
+    )
+    total_fats = models.FloatField(
+        verbose_name="Жиры, г",
+        null=True,
+        blank=True,
+    )
+    total_carbohydrates = models.FloatField(
+        verbose_name="Углеводы, г",
+        null=True,
+        blank=True,
+    )
+    total_price = models.FloatField(
+        verbose_name="Стоимость, руб.",
+        null=True,
+        blank=True,
+    )
+    calories_per_serving = models.FloatField(
+        verbose_name="Калорийность порции, ккал",
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+    price_per_serving = models.FloatField(
+        verbose_name="Стоимость порции, руб.",
+        null=True,
+        blank=True,
+        db_index=True,
+    )
+    nutrition_outdated = models.BooleanField(
+        verbose_name="Нужен пересчёт калорийности и стоимости",
+        default=True,
+    )
+    similar_outdated = models.BooleanField(
+        verbose_name="Нужен пересчёт похожих рецептов",
+        default=True,
+    )
+    data_version = models.PositiveIntegerField(
+        verbose_name="Версия данных для пересчётов",
+        default=0,
+        editable=False,
+    )
+    snapshot = models.TextField(
+        verbose_name="Снимок рецепта для API в JSON",
+        blank=True,
+        editable=False,
+    )
+
+    objects = RecipeQuerySet.as_manager()
 
     class Meta:
         ordering = ["-pub_date"]
@@ -106,6 +301,19 @@ class Recipe(models.Model):
                 fields=["author", "name"],
                 name="unique_author_name")
         ]
+        indexes = [
+            models.Index(fields=["-pub_date"], name="recipe_pub_date"),
+            models.Index(
+                fields=["nutrition_outdated"],
+                condition=models.Q(nutrition_outdated=True),
+                name="recipe_nutrition_outdated",
+            ),
+            models.Index(
+                fields=["similar_outdated"],
+                condition=models.Q(similar_outdated=True),
+                name="recipe_similar_outdated",
+            ),
+        ]
 
     def __str__(self):
         return self.name
@@ -132,13 +340,126 @@ class RecipeIngredient(models.Model):
     )
 
     class Meta:
+        ordering = ["id"]
         verbose_name = "Ингредиент в рецепте"
         verbose_name_plural = "Ингредиенты в рецептах"
+        indexes = [
+            # Ингредиенты и количества корзины при сборке списка покупок
+            # читаются из индекса; названия и отделы — из своих таблиц.
+            models.Index(fields=["recipe", "ingredient", "amount"],
+                         name="recipe_ingredient_amount"),
+        ]
 
     def __str__(self):
         return f"{self.ingredient}: {self.amount}"
 
 
+class SimilarRecipe(models.Model):
+    recipe = models.ForeignKey(
+        Recipe,
+        verbose_name="Рецепт",
+        on_delete=models.CASCADE,
+        related_name="similar_recipes",
+    )
+    similar = models.ForeignKey(
+        Recipe,
+        verbose_name="Похожий рецепт",
+        on_delete=models.CASCADE,
+        related_name="similar_to",
+    )
+    score = models.FloatField(
+        verbose_name="Сходство",
+    )
+
+    class Meta:
+        ordering = ["-score"]
+        verbose_name = "Похожий рецепт"
+        verbose_name_plural = "Похожие рецепты"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["recipe", "similar"],
+                name="unique_similar_recipe")
+        ]
+
+
+class Household(models.Model):
+    """Семья: участники скачивают общий список покупок по всем корзинам."""
+    name = models.CharField(
+        verbose_name="Название",
+        max_length=200,
+    )
+    owner = models.ForeignKey(
+        User,
+        verbose_name="Создатель",
+        on_delete=models.CASCADE,
+        related_name="owned_households",
+    )
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = "Семья"
+        verbose_name_plural = "Семьи"
+
+    def __str__(self):
+        return self.name
+
+
+class HouseholdMember(models.Model):
+    household = models.ForeignKey(
+        Household,
+        verbose_name="Семья",
+        on_delete=models.CASCADE,
+        related_name="members",
+    )
+    user = models.OneToOneField(
+        User,
+        verbose_name="Участник",
+        on_delete=models.CASCADE,
+        related_name="household_membership",
+    )
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = "Участник семьи"
+        verbose_name_plural = "Участники семей"
+
+    def __str__(self):
+        return f"{self.user} в семье {self.household}"
+
+
+class HouseholdInvite(models.Model):
+    """Приглашение в семью, участником приглашённый становится сам."""
+    household = models.ForeignKey(
+        Household,
+        verbose_name="Семья",
+        on_delete=models.CASCADE,
+        related_name="invites",
+    )
+    user = models.ForeignKey(
+        User,
+        verbose_name="Приглашённый",
+        on_delete=models.CASCADE,
+        related_name="household_invites",
+    )
+    created = models.DateTimeField(
+        verbose_name="Создано",
+        auto_now_add=True,
+    )
+
+    class Meta:
+        ordering = ["id"]
+        verbose_name = "Приглашение в семью"
+        verbose_name_plural = "Приглашения в семью"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["household", "user"],
+                name="unique_household_invite"),
+        ]
+
+    def __str__(self):
+        return f"{self.user} приглашён в семью {self.household}"
+
+
 class ShoppingCart(models.Model):
     user = models.ForeignKey(
         User,
@@ -152,6 +473,15 @@ class ShoppingCart(models.Model):
         on_delete=models.CASCADE,
         related_name="cart",
     )
+    servings = models.PositiveSmallIntegerField(
+        verbose_name="Количество порций",
+        null=True,
+        blank=True,
+        validators=[
+            MinValueValidator(1, "Количество порций не может быть меньше 1"),
+        ],
+        help_text="Пусто — столько порций, сколько в рецепте.",
+    )
 
     class Meta:
         verbose_name = "Корзина"
@@ -161,6 +491,77 @@ class ShoppingCart(models.Model):
                 fields=["recipe", "user"],
                 name="unique_recipe_in_cart")
         ]
+        indexes = [
+            models.Index(fields=["user", "recipe"], name="cart_user_recipe"),
+        ]
+
+
+class ShoppingListItem(models.Model):
+    """Готовый упорядоченный список покупок пользователя или семьи.
+
+    Строки собирает задача после изменения корзины или первой выгрузки и
+    удаляет изменение корзины, поэтому выгрузка читает их одним запросом
+    по индексу.
+    """
+    user = models.ForeignKey(
+        User,
+        verbose_name="Пользователь",
+        on_delete=models.CASCADE,
+        related_name="shopping_list",
+        null=True,
+        blank=True,
+    )
+    household = models.ForeignKey(
+        Household,
+        verbose_name="Семья",
+        on_delete=models.CASCADE,
+        related_name="shopping_list",
+        null=True,
+        blank=True,
+    )
+    target_unit = models.CharField(
+        verbose_name="Единица пересчёта",
+        max_length=200,
+    )
+    position = models.PositiveIntegerField(
+        verbose_name="Позиция",
+    )
+    category = models.CharField(
+        verbose_name="Категория",
+        max_length=200,
+        blank=True,
+    )
+    name = models.CharField(
+        verbose_name="Название ингредиента",
+        max_length=200,
+    )
+    unit = models.CharField(
+        verbose_name="Единица измерения",
+        max_length=200,
+    )
+    amount = models.FloatField(
+        verbose_name="Количество",
+    )
+
+    class Meta:
+        ordering = ["user", "target_unit", "position"]
+        verbose_name = "Строка списка покупок"
+        verbose_name_plural = "Списки покупок"
+        constraints = [
+            models.UniqueConstraint(
+                fields=["user", "target_unit", "position"],
+                name="unique_shopping_list_position"),
+            models.UniqueConstraint(
+                fields=["household", "target_unit", "position"],
+                name="unique_household_list_position"),
+            models.CheckConstraint(
+                check=models.Q(user=None, household__isnull=False)
+                | models.Q(user__isnull=False, household=None),
+                name="shopping_list_user_or_household"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.unit}): {self.amount}"
 
 
 class Favorite(models.Model):
@@ -185,3 +586,7 @@ class Favorite(models.Model):
                 fields=["recipe", "user"],
                 name="unique_recipe_in_favorited")
         ]
+        indexes = [
+            models.Index(fields=["user", "recipe"],
+                         name="favorite_user_recipe"),
+        ]
@@ -0,0 +1,139 @@
+import math
+
+from django.db import transaction
+
+from .models import (Ingredient, IngredientUnitMass, MeasurementUnit, Recipe,
+                     RecipeIngredient)
+
+NUTRIENTS = ("calories", "proteins", "fats", "carbohydrates", "price")
+TOTAL_FIELDS = tuple(f"total_{nutrient}" for nutrient in NUTRIENTS)
+RECIPE_FIELDS = TOTAL_FIELDS + (
+    "calories_per_serving", "price_per_serving", "nutrition_outdated")
+
+
+def ingredient_table():
+    """Отсортированные id ингредиентов и значения на одну их единицу.
+
+    Пищевая ценность и цена хранятся на 100 г, поэтому умножаются на массу
+    единицы измерения с учётом IngredientUnitMass. Неизвестные значения
+    и единицы без массы дают NaN.
+    """
+    grams = dict(MeasurementUnit.objects.exclude(grams=None).values_list(
+        "name", "grams"))
+    ingredient_grams = {
+        (name, unit): mass for name, unit, mass in
+        IngredientUnitMass.objects.values_list("name", "unit", "grams")
+    }
+    rows = list(Ingredient.objects.order_by("id").values_list(
+        "id", "name", "measurement_unit", *NUTRIENTS))
+    import numpy as np
+
+    ids = np.array([row[0] for row in rows], dtype=np.int64)
+    unit_grams = np.array([
+        ingredient_grams.get((row[1], row[2]), grams.get(row[2]))
+        for row in rows
+    ], dtype=float)
+    values = np.array([row[3:] for row in rows], dtype=float).reshape(
+        len(rows), len(NUTRIENTS))
+    return ids, values * unit_grams[:, np.newaxis] / 100
+
+
+def compute_totals(recipe_ids, rows, ingredient_ids, per_unit):
+    """Суммы по рецептам для строк (recipe_id, ingredient_id, amount).
+
+    recipe_ids должен быть отсортирован. Возвращает матрицу
+    len(recipe_ids) x len(NUTRIENTS). Если у ингредиента рецепта нет
+    значения, сумма по рецепту — NaN: неполные данные не выдаются за
+    меньшие калорийность и цену.
+    """
+    # numpy нужен только пересчёту, сигналы импортируют модуль без него.
+    import numpy as np
+
+    rows = np.asarray(rows, dtype=np.int64).reshape(-1, 3)
+    recipe_index = np.searchsorted(recipe_ids, rows[:, 0])
+    contributions = np.full((len(rows), len(NUTRIENTS)), np.nan)
+    if len(ingredient_ids):
+        ingredient_index = np.minimum(
+            np.searchsorted(ingredient_ids, rows[:, 1]),
+            len(ingredient_ids) - 1)
+        # Ингредиенты, добавленные после чтения таблицы, остаются NaN.
+        known = ingredient_ids[ingredient_index] == rows[:, 1]
+        contributions[known] = (per_unit[ingredient_index[known]]
+                                * rows[known, 2][:, np.newaxis])
+    return np.column_stack([
+        np.bincount(recipe_index, weights=contributions[:, column],
+                    minlength=len(recipe_ids))
+        for column in range(len(NUTRIENTS))
+    ])
+
+
+def update_nutrition(full=False, batch_size=2000):
+    """Пересчитывает калорийность и стоимость рецептов пачками по id.
+
+    По умолчанию обрабатываются только рецепты с nutrition_outdated.
+    Справочники и ингредиенты рецептов читаются после блокировки пачки:
+    правка, закоммиченная раньше, уже видна, а более поздняя ждёт
+    блокировку в mark_outdated и снова помечает рецепт к пересчёту.
+    Возвращает количество пересчитанных рецептов.
+    """
+    import numpy as np
+
+    recipes = Recipe.objects.order_by("id")
+    ingredients = RecipeIngredient.objects.all()
+    if not full:
+        recipes = recipes.filter(nutrition_outdated=True)
+        ingredients = ingredients.filter(recipe__nutrition_outdated=True)
+    last_id = 0
+    updated = 0
+    while True:
+        with transaction.atomic():
+            batch = list(recipes.select_for_update().filter(
+                id__gt=last_id).values_list("id", "servings")[:batch_size])
+            if not batch:
+                return updated
+            recipe_ids = np.array([row[0] for row in batch], dtype=np.int64)
+            servings = np.array([row[1] for row in batch], dtype=float)
+            last_id = batch[-1][0]
+            ingredient_ids, per_unit = ingredient_table()
+            rows = list(ingredients.filter(
+                recipe_id__gte=batch[0][0],
+                recipe_id__lte=last_id,
+            ).values_list("recipe_id", "ingredient_id", "amount"))
+            totals = compute_totals(recipe_ids, rows, ingredient_ids,
+                                    per_unit)
+            per_serving = totals / servings[:, np.newaxis]
+            objs = []
+            for index, recipe_id in enumerate(recipe_ids.tolist()):
+                recipe = Recipe(id=recipe_id, nutrition_outdated=False)
+                for column, field in enumerate(TOTAL_FIELDS):
+                    setattr(recipe, field, to_field(totals[index, column]))
+                recipe.calories_per_serving = to_field(
+                    per_serving[index, NUTRIENTS.index("calories")])
+                recipe.price_per_serving = to_field(
+                    per_serving[index, NUTRIENTS.index("price")])
+                objs.append(recipe)
+            Recipe.objects.bulk_update(objs, RECIPE_FIELDS, batch_size=500)
+            updated += len(objs)
+
+
+def to_field(value):
+    """Значение для поля рецепта: NaN (нет данных) сохраняется как NULL."""
+    value = float(value)
+    return None if math.isnan(value) else round(value, 2)
+
+
+def mark_outdated(ingredient_ids=None, units=None):
+    """Помечает к пересчёту рецепты с данными ингредиентами или единицами.
+
+    Флаг пишется и уже помеченным рецептам: запись ждёт блокировку идущего
+    пересчёта, и правка не теряется, когда он снимает флаг.
+    """
+    recipes = Recipe.objects.all()
+    if ingredient_ids is not None:
+        recipes = recipes.filter(
+            recipe_ingredient__ingredient_id__in=ingredient_ids)
+    if units is not None:
+        recipes = recipes.filter(
+            recipe_ingredient__ingredient__measurement_unit__in=units)
+    return Recipe.objects.filter(
+        id__in=recipes.values("id")).mark_outdated(similar=False)
@@ -1,3 +1,19 @@
+import math
+
+from django.db import transaction
+from django.db.models import (Case, CharField, ExpressionWrapper, F,
+                              FloatField, OuterRef, Q, Subquery, Sum, Value,
+                              When)
+from django.db.models.functions import Cast, Coalesce
+from users.models import User
+
+from .models import (Household, HouseholdMember, IngredientUnitMass,
+                     MeasurementUnit, RecipeIngredient, ShoppingListItem)
+
+BASE_UNIT = "г"
+OTHER_CATEGORY = "Прочее"
+
+
 def get_shopping_list(shopping_cart):
     list_of_ingredients = {}
     content = "----------- Список покупок -----------\n\n"
@@ -14,3 +30,203 @@ def get_shopping_list(shopping_cart):
                     f" — {amount}\n")
     content += "\n--------------------------------------"
     return content
+
+
+def unit_grams():
+    """Масса единицы измерения строки RecipeIngredient в граммах.
+
+    Сначала ищется масса для конкретного продукта, затем общая масса
+    единицы. Для единиц без массы выражение равно NULL.
+    """
+    ingredient_mass = IngredientUnitMass.objects.filter(
+        name=OuterRef("ingredient__name"),
+        unit=OuterRef("ingredient__measurement_unit"),
+    ).values("grams")[:1]
+    unit_mass = MeasurementUnit.objects.filter(
+        name=OuterRef("ingredient__measurement_unit"),
+    ).values("grams")[:1]
+    return Coalesce(Subquery(ingredient_mass, output_field=FloatField()),
+                    Subquery(unit_mass, output_field=FloatField()))
+
+
+def get_unit_grams(unit):
+    """Масса единицы в граммах или None, если в неё нельзя пересчитать."""
+    if unit == BASE_UNIT:
+        return 1
+    return MeasurementUnit.objects.filter(name=unit).exclude(
+        grams=None).values_list("grams", flat=True).first()
+
+
+def cart_amount():
+    """Количество ингредиента с учётом порций, заказанных в корзине.
+
+    Применяется к строкам RecipeIngredient, выбранным через recipe__cart.
+    """
+    return ExpressionWrapper(
+        Cast("amount", FloatField())
+        * Coalesce("recipe__cart__servings", "recipe__servings")
+        / F("recipe__servings"),
+        output_field=FloatField(),
+    )
+
+
+def aggregate_ingredients(recipe_ingredients, unit=BASE_UNIT, grams=1,
+                          amount=F("amount")):
+    """Суммы ингредиентов одним запросом с пересчётом в единицу unit.
+
+    Строки одного продукта в разных единицах с известной массой
+    складываются в unit, остальные остаются в своей единице. Результат
+    сгруппирован и упорядочен по отделам магазина, продукты без
+    категории идут в конце.
+    """
+    return recipe_ingredients.annotate(
+        unit_grams=unit_grams(),
+        line_amount=amount,
+    ).annotate(
+        unit=Case(
+            When(unit_grams=None, then=F("ingredient__measurement_unit")),
+            default=Value(unit),
+            output_field=CharField(),
+        ),
+    ).values(
+        "ingredient__category__position", "ingredient__category__name",
+        "ingredient__name", "unit",
+    ).annotate(
+        total_amount=Sum(Case(
+            When(unit_grams=None, then=F("line_amount")),
+            default=F("line_amount") * F("unit_grams") / grams,
+            output_field=FloatField(),
+        )),
+    ).order_by(
+        F("ingredient__category__position").asc(nulls_last=True),
+        "ingredient__category__name", "ingredient__name", "unit",
+    )
+
+
+def household_carts(user):
+    """Пользователи, чьи корзины входят в список покупок user.
+
+    Для участника семьи это все участники, иначе только он сам.
+    """
+    return User.objects.filter(
+        Q(pk=user.pk, household_membership=None)
+        | Q(household_membership__household__members__user=user),
+    ).values("pk")
+
+
+def cart_list_items(user, unit=BASE_UNIT, grams=1, owner=None):
+    """Несохранённые строки списка покупок по текущим корзинам.
+
+    Собираются одним сгруппированным запросом, упорядоченным в SQL.
+    owner — поля владельца для сохранения строк.
+    """
+    rows = aggregate_ingredients(
+        RecipeIngredient.objects.filter(
+            recipe__cart__user__in=household_carts(user)),
+        unit, grams, cart_amount())
+    return [
+        ShoppingListItem(
+            target_unit=unit, position=position, **(owner or {}),
+            category=row["ingredient__category__name"] or "",
+            name=row["ingredient__name"], unit=row["unit"],
+            amount=row["total_amount"],
+        )
+        for position, row in enumerate(rows)
+    ]
+
+
+def read_shopping_list(user, unit=BASE_UNIT):
+    """Собранный список покупок пользователя или его семьи.
+
+    Один запрос по индексу без блокировок. Пустой результат означает,
+    что список не собран или корзины пусты.
+    """
+    return list(ShoppingListItem.objects.filter(
+        Q(household__members__user=user)
+        | Q(user=user, user__household_membership=None),
+        target_unit=unit,
+    ).order_by("position"))
+
+
+def get_ordered_shopping_list(user, unit=BASE_UNIT, grams=1):
+    """Собирает и сохраняет упорядоченный список покупок в единице unit.
+
+    Участник семьи получает общий список по корзинам всех участников.
+    Вызывается из задачи, а не из выгрузки: блокировка владельца списка
+    согласована с invalidate_shopping_lists, и список, собранный по
+    устаревшей корзине, будет удалён после неё.
+    """
+    household_id = HouseholdMember.objects.filter(user=user).values_list(
+        "household_id", flat=True).first()
+    if household_id is None:
+        owner = {"user": user}
+        owners = User.objects.filter(pk=user.pk)
+    else:
+        owner = {"household_id": household_id}
+        owners = Household.objects.filter(pk=household_id)
+    items = ShoppingListItem.objects.filter(target_unit=unit, **owner)
+    with transaction.atomic():
+        list(owners.select_for_update().values_list("pk"))
+        ready = list(items.order_by("position"))
+        if ready:
+            return ready
+        ready = cart_list_items(user, unit, grams, owner)
+        ShoppingListItem.objects.bulk_create(
+            ready, batch_size=500, ignore_conflicts=True)
+    return ready
+
+
+def invalidate_shopping_lists(user_ids=None):
+    """Удаляет собранные списки покупок пользователей, по умолчанию все.
+
+    Вместе со списком пользователя удаляется общий список его семьи.
+    """
+    items = ShoppingListItem.objects.all()
+    if user_ids is not None:
+        with transaction.atomic():
+            list(User.objects.select_for_update().filter(
+                pk__in=user_ids).order_by("pk").values_list("pk"))
+            household_ids = list(Household.objects.select_for_update(
+            ).filter(pk__in=HouseholdMember.objects.filter(
+                user_id__in=user_ids).values("household_id"),
+            ).order_by("pk").values_list("pk", flat=True))
+            return items.filter(
+                Q(user_id__in=user_ids) | Q(household_id__in=household_ids),
+            ).delete()
+    return items.delete()
+
+
+def invalidate_household_list(household_id):
+    """Удаляет общий список семьи, например при смене участников."""
+    with transaction.atomic():
+        list(Household.objects.select_for_update().filter(
+            pk=household_id).values_list("pk"))
+        return ShoppingListItem.objects.filter(
+            household_id=household_id).delete()
+
+
+def format_shopping_list(items):
+    """Текст списка покупок с заголовками отделов."""
+    lines = []
+    category = None
+    for item in items:
+        if item.category != category or not lines:
+            category = item.category
+            if lines:
+                lines.append("")
+            lines.append(category or OTHER_CATEGORY)
+        lines.append(f"{item.name} ({item.unit}) - "
+                     f"{format_amount(item.amount)}")
+    return "Ваш список покупок:\n\n" + "\n".join(lines)
+
+
+def format_amount(amount):
+    """Количество для списка покупок с двумя знаками после запятой.
+
+    Меньше единицы выводится с тремя значащими цифрами, чтобы 1 г в
+    килограммах не округлялся до нуля.
+    """
+    digits = 2
+    if 0 < amount < 1:
+        digits = 2 - math.floor(math.log10(amount))
+    return f"{amount:.{digits}f}".rstrip("0").rstrip(".")
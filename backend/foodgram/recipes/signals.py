@@ -0,0 +1,80 @@
+from django.db.models.signals import (m2m_changed, post_delete, post_save,
+                                      pre_delete)
+from django.dispatch import receiver
+
+from .models import (HouseholdMember, Ingredient, IngredientCategory,
+                     IngredientUnitMass, MeasurementUnit, Recipe,
+                     RecipeIngredient, ShoppingCart)
+from .nutrition import mark_outdated
+from .shopping_list import invalidate_household_list, invalidate_shopping_lists
+from .tasks import schedule_recompute, schedule_shopping_list
+
+
+@receiver(post_save, sender=Recipe)
+def recipe_saved(sender, instance, created, **kwargs):
+    if not created:
+        Recipe.objects.filter(pk=instance.pk).mark_outdated()
+    schedule_recompute()
+
+
+@receiver(pre_delete, sender=Recipe)
+def recipe_deleted(sender, instance, **kwargs):
+    Recipe.objects.filter(
+        similar_recipes__similar=instance).mark_outdated(nutrition=False)
+    schedule_recompute(nutrition=False)
+
+
+@receiver(m2m_changed, sender=Recipe.tags.through)
+def recipe_tags_changed(sender, instance, action, **kwargs):
+    if action in ("post_add", "post_remove", "post_clear"):
+        Recipe.objects.filter(pk=instance.pk).mark_outdated(nutrition=False)
+        schedule_recompute(nutrition=False)
+
+
+@receiver((post_save, post_delete), sender=RecipeIngredient)
+def recipe_ingredient_changed(sender, instance, **kwargs):
+    Recipe.objects.filter(pk=instance.recipe_id).mark_outdated()
+    schedule_recompute()
+    invalidate_shopping_lists(ShoppingCart.objects.filter(
+        recipe_id=instance.recipe_id).values("user_id"))
+
+
+@receiver(post_save, sender=Ingredient)
+def ingredient_saved(sender, instance, created, **kwargs):
+    if not created:
+        mark_outdated(ingredient_ids=[instance.pk])
+        schedule_recompute(similar=False)
+        invalidate_shopping_lists(ShoppingCart.objects.filter(
+            recipe__recipe_ingredient__ingredient=instance,
+        ).values("user_id"))
+
+
+@receiver((post_save, post_delete), sender=MeasurementUnit)
+def unit_changed(sender, instance, **kwargs):
+    mark_outdated(units=[instance.name])
+    schedule_recompute(similar=False)
+    invalidate_shopping_lists()
+
+
+@receiver((post_save, post_delete), sender=IngredientUnitMass)
+def ingredient_unit_mass_changed(sender, instance, **kwargs):
+    mark_outdated(ingredient_ids=Ingredient.objects.filter(
+        name=instance.name, measurement_unit=instance.unit_id).values("id"))
+    schedule_recompute(similar=False)
+    invalidate_shopping_lists()
+
+
+@receiver((post_save, post_delete), sender=IngredientCategory)
+def category_changed(sender, instance, **kwargs):
+    invalidate_shopping_lists()
+
+
+@receiver((post_save, post_delete), sender=ShoppingCart)
+def shopping_cart_changed(sender, instance, **kwargs):
+    invalidate_shopping_lists([instance.user_id])
+    schedule_shopping_list([instance.user_id])
+
+
+@receiver((post_save, post_delete), sender=HouseholdMember)
+def household_member_changed(sender, instance, **kwargs):
+    invalidate_household_list(instance.household_id)
@@ -0,0 +1,211 @@
+import numpy as np
+from django.db import transaction
+from django.db.models import Count, Min
+from scipy import sparse
+
+from .models import Recipe, RecipeIngredient, SimilarRecipe
+
+TOP_K = 10
+TAG_WEIGHT = 0.5
+# Ингредиенты, которые есть у большей доли рецептов (соль, сахар), почти
+# не различают рецепты, но делают произведение матриц плотным.
+MAX_FEATURE_SHARE = 0.05
+MIN_DROPPED_COUNT = 100
+BATCH_SIZE = 500
+
+
+POPCOUNT = np.array([bin(byte).count("1") for byte in range(256)],
+                    dtype=np.uint8)
+
+
+class FeatureMatrix:
+    """Признаки рецептов: разреженные ингредиенты и битовые маски тегов.
+
+    Веса ингредиентов взвешены по IDF, строки нормированы по L2, поэтому
+    скалярное произведение строк равно косинусному сходству. Все теги
+    рецепта имеют одинаковый вес, и их вклад считается как число общих
+    тегов, умноженное на веса пары. Кандидаты в соседи ищутся только по
+    общим ингредиентам: общий тег есть почти у каждой пары рецептов.
+    """
+
+    def __init__(self, ingredients, tag_masks, tag_weights):
+        self.ingredients = ingredients
+        self.ingredients_t = ingredients.T.tocsr()
+        self.tag_masks = tag_masks
+        self.tag_weights = tag_weights
+
+    def __len__(self):
+        return self.ingredients.shape[0]
+
+    @property
+    def nnz(self):
+        return self.ingredients.nnz + int(popcount(self.tag_masks).sum())
+
+    def scores(self, rows):
+        """Разреженная CSR-матрица сходства строк rows со всеми рецептами."""
+        rows = np.asarray(rows)
+        scores = (self.ingredients[rows] @ self.ingredients_t).tocsr()
+        recipes = np.repeat(rows, np.diff(scores.indptr))
+        common = popcount(
+            self.tag_masks[recipes] & self.tag_masks[scores.indices])
+        scores.data += (common * self.tag_weights[recipes]
+                        * self.tag_weights[scores.indices])
+        return scores
+
+
+def popcount(masks):
+    """Число единичных битов в каждой строке матрицы масок."""
+    if hasattr(np, "bitwise_count"):
+        return np.bitwise_count(masks).sum(axis=1)
+    return POPCOUNT[masks.view(np.uint8)].sum(axis=1, dtype=np.int64)
+
+
+def _feature_columns(recipe_ids, pairs):
+    pairs = np.asarray(pairs, dtype=np.int64).reshape(-1, 2)
+    features, cols = np.unique(pairs[:, 1], return_inverse=True)
+    return np.searchsorted(recipe_ids, pairs[:, 0]), cols, len(features)
+
+
+def build_matrix(recipe_ids, ingredient_pairs, tag_pairs,
+                 tag_weight=TAG_WEIGHT, max_share=MAX_FEATURE_SHARE):
+    """Матрица признаков для отсортированных recipe_ids.
+
+    Пары (recipe_id, ingredient_id) и (recipe_id, tag_id) задают признаки.
+    """
+    size = max(len(recipe_ids), 1)
+    rows, cols, columns = _feature_columns(recipe_ids, ingredient_pairs)
+    ingredients = sparse.csr_matrix(
+        (np.ones(len(rows)), (rows, cols)), shape=(len(recipe_ids), columns))
+    ingredients.data = np.minimum(ingredients.data, 1.0)
+    counts = np.bincount(cols, minlength=columns)
+    idf = np.where(
+        counts > max(max_share * size, MIN_DROPPED_COUNT), 0.0,
+        np.log(size / np.maximum(counts, 1)))
+    ingredients = (ingredients @ sparse.diags(idf)).tocsr()
+
+    rows, cols, columns = _feature_columns(recipe_ids, tag_pairs)
+    tag_masks = np.zeros((len(recipe_ids), columns // 64 + 1),
+                         dtype=np.uint64)
+    np.bitwise_or.at(tag_masks, (rows, cols // 64),
+                     np.left_shift(1, cols % 64).astype(np.uint64))
+    tag_counts = popcount(tag_masks)
+
+    norms = np.sqrt(
+        np.asarray(ingredients.multiply(ingredients).sum(axis=1)).ravel()
+        + tag_counts * tag_weight ** 2)
+    norms[norms == 0] = 1
+    ingredients = (sparse.diags(1 / norms) @ ingredients).tocsr()
+    ingredients.eliminate_zeros()
+    return FeatureMatrix(ingredients, tag_masks, tag_weight / norms)
+
+
+def top_k(matrix, rows, k=TOP_K):
+    """k ближайших соседей для строк rows: список пар (индексы, сходство)."""
+    scores = matrix.scores(rows)
+    result = []
+    for position, row in enumerate(rows):
+        start, end = scores.indptr[position], scores.indptr[position + 1]
+        cols = scores.indices[start:end]
+        values = scores.data[start:end]
+        keep = cols != row
+        cols, values = cols[keep], values[keep]
+        if len(values) > k:
+            best = np.argpartition(-values, k)[:k]
+            cols, values = cols[best], values[best]
+        order = np.argsort(-values, kind="stable")
+        result.append((cols[order], values[order]))
+    return result
+
+
+def load_matrix():
+    recipe_ids = np.array(
+        list(Recipe.objects.order_by("id").values_list("id", flat=True)),
+        dtype=np.int64)
+    ingredient_pairs = list(RecipeIngredient.objects.values_list(
+        "recipe_id", "ingredient_id"))
+    tag_pairs = list(Recipe.tags.through.objects.values_list(
+        "recipe_id", "tag_id"))
+    return recipe_ids, build_matrix(recipe_ids, ingredient_pairs, tag_pairs)
+
+
+def affected_rows(matrix, recipe_ids, touched, k):
+    """Строки, чьи списки соседей могут измениться из-за touched.
+
+    Это сами изменённые рецепты, рецепты, у которых они уже в списке, и
+    рецепты, в чей top-k они теперь проходят по сходству.
+    """
+    touched_ids = recipe_ids[touched].tolist()
+    affected = set(touched.tolist())
+    listing = set()
+    for start in range(0, len(touched_ids), BATCH_SIZE):
+        listing.update(SimilarRecipe.objects.filter(
+            similar_id__in=touched_ids[start:start + BATCH_SIZE],
+        ).values_list("recipe_id", flat=True))
+
+    scores = matrix.scores(touched).tocsc()
+    best = np.asarray(scores.max(axis=0).todense()).ravel()
+    candidates = np.flatnonzero(best)
+    candidate_ids = recipe_ids[candidates].tolist()
+    worst = {}
+    for start in range(0, len(candidate_ids), BATCH_SIZE):
+        worst.update({
+            row["recipe_id"]: (row["count"], row["score"])
+            for row in SimilarRecipe.objects.filter(
+                recipe_id__in=candidate_ids[start:start + BATCH_SIZE],
+            ).values("recipe_id").annotate(
+                count=Count("id"), score=Min("score"))
+        })
+    for row, recipe_id in zip(candidates.tolist(), candidate_ids):
+        count, score = worst.get(recipe_id, (0, 0))
+        if count < k or best[row] > score:
+            affected.add(row)
+    affected.update(np.searchsorted(recipe_ids, list(listing)).tolist())
+    return np.array(sorted(affected), dtype=np.int64)
+
+
+def update_similar(full=False, k=TOP_K, batch_size=BATCH_SIZE):
+    """Пересобирает таблицу похожих рецептов.
+
+    По умолчанию пересчитываются только списки, затронутые рецептами с
+    similar_outdated. Флаг снимается в той же транзакции, что и запись
+    списков рецепта, и только если data_version рецепта не изменилась с
+    начала пересборки: после ошибки или правки во время пересборки рецепт
+    пересчитается снова. Возвращает количество пересчитанных рецептов.
+    """
+    versions = dict(Recipe.objects.filter(
+        similar_outdated=True).values_list("id", "data_version"))
+    touched_ids = list(versions)
+    if not full and not touched_ids:
+        return 0
+    recipe_ids, matrix = load_matrix()
+    touched = np.flatnonzero(np.isin(recipe_ids, touched_ids))
+    if full:
+        rows = np.arange(len(matrix))
+    else:
+        rows = affected_rows(matrix, recipe_ids, touched, k)
+    touched_set = set(recipe_ids[touched].tolist())
+
+    for start in range(0, len(rows), batch_size):
+        batch = rows[start:start + batch_size]
+        batch_ids = recipe_ids[batch].tolist()
+        objs = [
+            SimilarRecipe(recipe_id=recipe_id, similar_id=similar_id,
+                          score=round(score, 6))
+            for recipe_id, (cols, values) in zip(
+                batch_ids, top_k(matrix, batch, k))
+            for similar_id, score in zip(recipe_ids[cols].tolist(),
+                                         values.tolist())
+        ]
+        with transaction.atomic():
+            SimilarRecipe.objects.filter(recipe_id__in=batch_ids).delete()
+            SimilarRecipe.objects.bulk_create(objs, batch_size=1000)
+            unchanged = [
+                recipe_id for recipe_id, version in Recipe.objects.filter(
+                    id__in=touched_set.intersection(batch_ids),
+                ).select_for_update().order_by("id").values_list(
+                    "id", "data_version")
+                if versions[recipe_id] == version
+            ]
+            Recipe.objects.filter(id__in=unchanged).update(
+                similar_outdated=False)
+    return len(rows)
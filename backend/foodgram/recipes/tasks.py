@@ -0,0 +1,45 @@
+from tasks.queue import enqueue, task
+from users.models import User
+
+from .shopping_list import BASE_UNIT, get_ordered_shopping_list, get_unit_grams
+
+# Пересчёты копят изменения несколько секунд и делаются одной задачей.
+RECOMPUTE_DELAY = 5
+
+
+# Пересчёты импортируются в задачах: numpy и scipy нужны только воркеру,
+# а этот модуль загружается сигналами в каждом процессе gunicorn.
+@task()
+def recompute_nutrition():
+    from .nutrition import update_nutrition
+    update_nutrition()
+
+
+@task()
+def recompute_similar():
+    from .similarity import update_similar
+    update_similar()
+
+
+@task()
+def build_shopping_list(user_id, unit=BASE_UNIT):
+    """Заранее собирает список покупок, чтобы выгрузка его только читала."""
+    user = User.objects.filter(pk=user_id).first()
+    grams = get_unit_grams(unit)
+    if user is not None and grams is not None:
+        get_ordered_shopping_list(user, unit, grams)
+
+
+def schedule_recompute(nutrition=True, similar=True):
+    if nutrition:
+        enqueue(recompute_nutrition, key="recipes.nutrition",
+                delay=RECOMPUTE_DELAY)
+    if similar:
+        enqueue(recompute_similar, key="recipes.similar",
+                delay=RECOMPUTE_DELAY)
+
+
+def schedule_shopping_list(user_ids, unit=BASE_UNIT):
+    for user_id in user_ids:
+        enqueue(build_shopping_list, key=f"shopping_list.{user_id}.{unit}",
+                user_id=user_id, unit=unit)
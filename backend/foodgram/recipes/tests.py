@@ -0,0 +1,50 @@
+from django.test import TestCase
+from rest_framework.test import APIClient
+from users.models import User
+
+from .models import Ingredient, MeasurementUnit, Recipe, RecipeIngredient
+from .nutrition import update_nutrition
+
+
+class NutritionTests(TestCase):
+
+    def setUp(self):
+        MeasurementUnit.objects.create(name="г", grams=1)
+        author = User.objects.create_user(
+            username="author", email="author@example.com", password="pass")
+        sugar = Ingredient.objects.create(
+            name="сахар", measurement_unit="г", calories=400, price=10)
+        truffle = Ingredient.objects.create(
+            name="трюфель", measurement_unit="г", price=5000)
+        self.light = Recipe.objects.create(
+            author=author, name="Сироп", text="Сироп", cooking_time=5,
+            image="upload/syrup.png")
+        RecipeIngredient.objects.create(
+            recipe=self.light, ingredient=sugar, amount=50)
+        self.unknown = Recipe.objects.create(
+            author=author, name="Паста", text="Паста", cooking_time=5,
+            image="upload/pasta.png")
+        RecipeIngredient.objects.create(
+            recipe=self.unknown, ingredient=sugar, amount=10)
+        RecipeIngredient.objects.create(
+            recipe=self.unknown, ingredient=truffle, amount=100)
+        update_nutrition()
+
+    def test_missing_value_leaves_nutrient_empty(self):
+        self.light.refresh_from_db()
+        self.unknown.refresh_from_db()
+        self.assertEqual(self.light.total_calories, 200)
+        self.assertIsNone(self.unknown.total_calories)
+        self.assertIsNone(self.unknown.calories_per_serving)
+        self.assertEqual(self.unknown.total_price, 5001)
+        self.assertFalse(self.unknown.nutrition_outdated)
+
+    def test_incomplete_recipe_is_not_light(self):
+        client = APIClient()
+        response = client.get("/api/recipes/", {"max_calories": 1000})
+        self.assertEqual([recipe["id"] for recipe in response.data[
+            "results"]], [self.light.pk])
+        response = client.get("/api/recipes/",
+                              {"ordering": "calories_per_serving"})
+        self.assertEqual([recipe["id"] for recipe in response.data[
+            "results"]], [self.light.pk, self.unknown.pk])
@@ -0,0 +1,17 @@
+from django.contrib import admin
+from foodgram.paginators import EstimatedCountPaginator
+
+from .models import Task
+
+
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ("pk", "name", "key", "status", "attempts", "run_after",
+                    "finished")
+    list_filter = ("status", "name")
+    search_fields = ("name", "key")
+    readonly_fields = ("created", "finished", "last_error")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+admin.site.register(Task, TaskAdmin)
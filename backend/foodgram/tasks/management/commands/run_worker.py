@@ -0,0 +1,24 @@
+from django.conf import settings
+from django.core.management import BaseCommand
+from tasks.worker import purge, run
+
+
+class Command(BaseCommand):
+    help = ("Выполняет фоновые задачи из очереди в пуле процессов. "
+            "Внешний брокер не нужен: очередь хранится в базе.")
+
+    def add_arguments(self, parser):
+        parser.add_argument("--processes", type=int,
+                            default=settings.TASKS_PROCESSES)
+        parser.add_argument("--poll-interval", type=float, default=1.0,
+                            help="пауза в секундах, когда очередь пуста")
+        parser.add_argument("--once", action="store_true",
+                            help="выйти, когда готовые задачи кончатся")
+
+    def handle(self, *args, **options):
+        purged = purge(settings.TASKS_KEEP_DAYS)
+        if purged:
+            self.stdout.write(f"Удалено старых задач: {purged}")
+        processed = run(options["processes"], options["poll_interval"],
+                        options["once"])
+        self.stdout.write(f"Выполнено задач: {processed}")
@@ -0,0 +1,92 @@
+from django.db import models
+from django.utils import timezone
+
+
+class Task(models.Model):
+    """Задача фоновой очереди.
+
+    Воркер run_worker забирает задачи со статусом queued, у которых
+    наступил run_after. Задача с истёкшим locked_until считается
+    брошенной упавшим воркером и забирается снова.
+    """
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+    STATUSES = (
+        (QUEUED, "В очереди"),
+        (RUNNING, "Выполняется"),
+        (DONE, "Выполнена"),
+        (FAILED, "Ошибка"),
+    )
+
+    name = models.CharField(
+        verbose_name="Задача",
+        max_length=200,
+    )
+    kwargs = models.TextField(
+        verbose_name="Аргументы в JSON",
+        default="{}",
+    )
+    key = models.CharField(
+        verbose_name="Ключ идемпотентности",
+        max_length=200,
+        null=True,
+        blank=True,
+    )
+    status = models.CharField(
+        verbose_name="Статус",
+        max_length=10,
+        choices=STATUSES,
+        default=QUEUED,
+    )
+    attempts = models.PositiveSmallIntegerField(
+        verbose_name="Попыток",
+        default=0,
+    )
+    max_attempts = models.PositiveSmallIntegerField(
+        verbose_name="Максимум попыток",
+        default=5,
+    )
+    run_after = models.DateTimeField(
+        verbose_name="Выполнить не раньше",
+        default=timezone.now,
+    )
+    locked_until = models.DateTimeField(
+        verbose_name="Занята воркером до",
+        null=True,
+        blank=True,
+    )
+    last_error = models.TextField(
+        verbose_name="Последняя ошибка",
+        blank=True,
+    )
+    created = models.DateTimeField(
+        verbose_name="Создана",
+        auto_now_add=True,
+    )
+    finished = models.DateTimeField(
+        verbose_name="Завершена",
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        ordering = ["-created"]
+        verbose_name = "Фоновая задача"
+        verbose_name_plural = "Фоновые задачи"
+        constraints = [
+            # Одна ещё не начатая задача на ключ.
+            models.UniqueConstraint(
+                fields=["key"],
+                condition=models.Q(status="queued"),
+                name="unique_queued_task_key",
+            )
+        ]
+        indexes = [
+            models.Index(fields=["status", "run_after"],
+                         name="task_status_run_after"),
+        ]
+
+    def __str__(self):
+        return f"{self.name} ({self.get_status_display()})"
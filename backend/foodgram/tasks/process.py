@@ -0,0 +1,26 @@
+"""Код, который выполняется в процессах пула воркера.
+
+Процессы запускаются методом spawn и импортируют этот модуль до
+настройки Django, поэтому модели и реестр задач подключаются только
+после django.setup().
+"""
+import json
+
+import django
+
+
+def init_process():
+    django.setup()
+
+
+def execute(name, kwargs):
+    """Выполняет задачу в процессе пула."""
+    from django.db import close_old_connections
+
+    from .queue import REGISTRY
+
+    close_old_connections()
+    try:
+        REGISTRY[name](**json.loads(kwargs))
+    finally:
+        close_old_connections()
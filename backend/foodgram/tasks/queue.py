@@ -0,0 +1,61 @@
+import json
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .models import Task
+
+REGISTRY = {}
+
+
+def task(name=None, max_attempts=5):
+    """Регистрирует функцию как фоновую задачу.
+
+    Аргументы задачи передаются именованными и должны сериализоваться
+    в JSON. Функция выполняется в отдельном процессе воркера.
+    """
+    def decorator(func):
+        func.task_name = name or f"{func.__module__}.{func.__name__}"
+        func.max_attempts = max_attempts
+        REGISTRY[func.task_name] = func
+        return func
+    return decorator
+
+
+def enqueue(func, key=None, delay=0, **kwargs):
+    """Ставит задачу в очередь в текущей транзакции.
+
+    Задача станет видна воркеру только после коммита. Если задача с тем
+    же key ещё ждёт в очереди, новая не создаётся и возвращается
+    ожидающая: так несколько изменений подряд дают один пересчёт, а
+    повторный запрос клиента — одну задачу.
+    """
+    name = getattr(func, "task_name", func)
+    if name not in REGISTRY:
+        raise ValueError(f"Неизвестная задача: {name}")
+    if key is not None:
+        queued = Task.objects.filter(key=key, status=Task.QUEUED).first()
+        if queued is not None:
+            return queued
+    new_task = Task(
+        name=name,
+        kwargs=json.dumps(kwargs),
+        key=key,
+        max_attempts=REGISTRY[name].max_attempts,
+        run_after=timezone.now() + timedelta(seconds=delay),
+    )
+    try:
+        with transaction.atomic():
+            new_task.save()
+    except IntegrityError:
+        # Задачу с этим ключом только что поставил другой процесс.
+        return Task.objects.get(key=key, status=Task.QUEUED)
+    return new_task
+
+
+def retry_delay(attempts):
+    """Экспоненциальная задержка перед повтором после attempts попыток."""
+    return min(settings.TASKS_RETRY_BACKOFF * 2 ** (attempts - 1),
+               settings.TASKS_MAX_BACKOFF)
@@ -0,0 +1,162 @@
+import logging
+import multiprocessing
+import time
+import traceback
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import IntegrityError, close_old_connections, transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Task
+from .process import execute, init_process
+from .queue import REGISTRY, retry_delay
+
+logger = logging.getLogger(__name__)
+
+
+def claim(limit):
+    """Забирает до limit готовых к выполнению задач.
+
+    На PostgreSQL строки, которые уже забирает другой воркер,
+    пропускаются (SKIP LOCKED), поэтому воркеров можно запускать несколько.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        tasks = list(Task.objects.select_for_update(skip_locked=True).filter(
+            Q(status=Task.QUEUED, run_after__lte=now)
+            | Q(status=Task.RUNNING, locked_until__lt=now),
+        ).order_by("run_after")[:limit])
+        expired = [task.id for task in tasks
+                   if task.attempts >= task.max_attempts]
+        Task.objects.filter(id__in=expired).update(
+            status=Task.FAILED, finished=now, locked_until=None,
+            last_error="Воркер не завершил задачу за отведённое время.")
+        tasks = [task for task in tasks if task.id not in expired]
+        Task.objects.filter(id__in=[task.id for task in tasks]).update(
+            status=Task.RUNNING, attempts=F("attempts") + 1,
+            locked_until=now + timedelta(seconds=settings.TASKS_TIMEOUT))
+    for task in tasks:
+        task.attempts += 1
+    return tasks
+
+
+def finish(task, error=None):
+    """Отмечает результат задачи, при ошибке назначает повтор."""
+    now = timezone.now()
+    tasks = Task.objects.filter(id=task.id)
+    if error is None:
+        tasks.update(status=Task.DONE, finished=now, locked_until=None)
+    elif task.attempts < task.max_attempts:
+        logger.warning("Задача %s упала, попытка %s: %s",
+                       task.name, task.attempts, error)
+        try:
+            with transaction.atomic():
+                tasks.update(
+                    status=Task.QUEUED, locked_until=None, last_error=error,
+                    run_after=now + timedelta(
+                        seconds=retry_delay(task.attempts)))
+        except IntegrityError:
+            # С тем же ключом в очереди уже есть задача, она и повторит.
+            tasks.update(status=Task.FAILED, finished=now, locked_until=None,
+                         last_error=error)
+    else:
+        logger.error("Задача %s не выполнена за %s попыток: %s",
+                     task.name, task.attempts, error)
+        tasks.update(status=Task.FAILED, finished=now, locked_until=None,
+                     last_error=error)
+
+
+def heartbeat(tasks):
+    """Продлевает блокировку выполняющихся задач.
+
+    Без продления долгая задача, например полный пересчёт похожих
+    рецептов, считалась бы брошенной и запускалась бы второй раз.
+    """
+    Task.objects.filter(
+        id__in=[task.id for task in tasks], status=Task.RUNNING,
+    ).update(locked_until=timezone.now() + timedelta(
+        seconds=settings.TASKS_TIMEOUT))
+
+
+def purge(days):
+    """Удаляет выполненные задачи старше days дней."""
+    return Task.objects.filter(
+        status=Task.DONE,
+        finished__lt=timezone.now() - timedelta(days=days),
+    ).delete()[0]
+
+
+def run(processes, poll_interval=1.0, once=False):
+    """Основной цикл воркера: забирает задачи и выполняет их в пуле.
+
+    С once=True выходит, когда в очереди не осталось готовых задач.
+    Возвращает число обработанных задач.
+    """
+    processed = 0
+    pool = create_pool(processes)
+    running = {}
+    beat = time.monotonic()
+    try:
+        while True:
+            free = processes - len(running)
+            if free:
+                for task in claim(free):
+                    if task.name not in REGISTRY:
+                        finish(task, f"Неизвестная задача: {task.name}")
+                        continue
+                    pool, future = submit(pool, processes, task)
+                    running[future] = task
+            if not running:
+                if once:
+                    return processed
+                close_old_connections()
+                time.sleep(poll_interval)
+                continue
+            done, _ = wait(running, timeout=poll_interval,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                report(future, running.pop(future))
+                processed += 1
+            if running and time.monotonic() - beat >= (
+                    settings.TASKS_HEARTBEAT):
+                heartbeat(running.values())
+                beat = time.monotonic()
+    finally:
+        # При остановке дожидаемся начатых задач, продлевая их блокировку,
+        # и записываем результат.
+        while running:
+            done, _ = wait(running, timeout=settings.TASKS_HEARTBEAT,
+                           return_when=FIRST_COMPLETED)
+            for future in done:
+                report(future, running.pop(future))
+            heartbeat(running.values())
+        pool.shutdown(wait=True)
+
+
+def create_pool(processes):
+    return ProcessPoolExecutor(
+        max_workers=processes,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=init_process,
+    )
+
+
+def submit(pool, processes, task):
+    """Отправляет задачу в пул, сломанный пул пересоздаётся."""
+    try:
+        return pool, pool.submit(execute, task.name, task.kwargs)
+    except BrokenProcessPool:
+        # Процесс пула упал, его задачи уже отмечены ошибкой и повторятся.
+        pool.shutdown(wait=False)
+        pool = create_pool(processes)
+        return pool, pool.submit(execute, task.name, task.kwargs)
+
+
+def report(future, task):
+    error = future.exception()
+    finish(task, None if error is None else "".join(
+        traceback.format_exception(type(error), error, error.__traceback__)))
@@ -1,6 +1,24 @@
 from django.contrib import admin
+from foodgram.paginators import EstimatedCountPaginator
 
 from .models import Follow, User
 
-admin.site.register(User)
-admin.site.register(Follow)
+
+class UserAdmin(admin.ModelAdmin):
+    list_display = ("pk", "username", "email", "first_name", "last_name")
+    search_fields = ("username", "email", "first_name", "last_name")
+    list_filter = ("is_staff", "is_active")
+
+
+class FollowAdmin(admin.ModelAdmin):
+    list_display = ("pk", "user", "author")
+    list_select_related = ("user", "author")
+    search_fields = ("user__username", "user__email", "author__username",
+                     "author__email")
+    autocomplete_fields = ("user", "author")
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+
+admin.site.register(User, UserAdmin)
+admin.site.register(Follow, FollowAdmin)
@@ -56,6 +56,9 @@ class Follow(models.Model):
                 name="prevent_self_follow",
             ),
         ]
+        indexes = [
+            models.Index(fields=["user", "-id"], name="follow_user_id"),
+        ]
 
     def __str__(self):
         return f"{self.user} подписан(а) на {self.author}"